@@ -16,11 +16,12 @@ that match the pattern: {instrument}-{camp}-time-table.xlsx
 import re
 import os
 import datetime
-import csv
-from openpyxl import load_workbook, Workbook
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Alignment, Font, Border, Side
 from openpyxl.utils import get_column_letter
-from shared_utils import sanitize_filename, process_sheet, load_student_name_mapping, load_room_no_mapping
+from openpyxl.worksheet.cell_range import CellRange
+from shared_utils import sanitize_filename, load_processed_sheets, load_student_name_mapping, load_room_no_mapping, read_csv_columns
 
 # PDF conversion imports
 try:
@@ -31,6 +32,26 @@ except ImportError:
     print("Warning: PDF conversion not available. Install pywin32 to enable PDF export.")
     PDF_CONVERSION_AVAILABLE = False
 
+# Shared style objects; openpyxl styles are immutable, so one instance can be assigned to every cell
+THIN_BORDER = Border(
+    left=Side(style='thin'), right=Side(style='thin'),
+    top=Side(style='thin'), bottom=Side(style='thin')
+)
+CENTER_WRAP = Alignment(horizontal='center', vertical='center', wrap_text=True)
+TITLE_FONT = Font(bold=True, size=28)
+BOLD_FONT = Font(bold=True, size=20)
+REGULAR_FONT = Font(size=20)
+
+def styled_cell(worksheet, value=None, font=REGULAR_FONT):
+    """
+    Creates a write-only cell with the shared border, alignment and font.
+    """
+    cell = WriteOnlyCell(worksheet, value=value)
+    cell.border = THIN_BORDER
+    cell.alignment = CENTER_WRAP
+    cell.font = font
+    return cell
+
 def convert_excel_to_pdf(xlsx_file_path, pdf_file_path):
     """
     Convert Excel file to PDF using Excel COM automation.
@@ -119,11 +140,7 @@ def load_group_mappings(filename, music_instrument):
     group_mappings = {}
     try:
         with open(filename, mode='r', encoding='utf-8-sig') as infile:
-            reader = csv.DictReader(infile)
-            for row in reader:
-                group_number = row.get('group_number')
-                student_nos_str = row.get('student_no')
-
+            for group_number, student_nos_str in read_csv_columns(infile, 'group_number', 'student_no'):
                 if group_number and student_nos_str:
                     group_name = f"Group {group_number.strip()}"
                     
@@ -162,10 +179,7 @@ def load_room_mapping(filename):
     room_mappings = {}
     try:
         with open(filename, mode='r', encoding='utf-8-sig') as infile:
-            reader = csv.DictReader(infile)
-            for row in reader:
-                teacher_name = row.get('teacher_name')
-                room_number = row.get('room_name')
+            for teacher_name, room_number in read_csv_columns(infile, 'teacher_name', 'room_name'):
                 if teacher_name and room_number:
                     room_mappings[teacher_name.strip()] = room_number.strip()
     except FileNotFoundError:
@@ -199,9 +213,11 @@ def generate_individual_timetables(input_filename):
     print(f"Camp: {camp_part}")
     
     try:
-        # Load the workbook
-        workbook = load_workbook(input_filename, data_only=True)
-        print(f"Loaded workbook with sheets: {workbook.sheetnames}")
+        # Load the workbook once and process all sheets, streaming the cell values only.
+        # Sheet data has merged cells filled in and is keyed by sheet name in workbook order.
+        processed_sheets = load_processed_sheets(input_filename)
+        sheet_names = list(processed_sheets)
+        print(f"Loaded workbook with sheets: {sheet_names}")
     except FileNotFoundError:
         print(f"Error: {input_filename} not found.")
         return
@@ -234,12 +250,6 @@ def generate_individual_timetables(input_filename):
                 student_to_groups[s] = set()
             student_to_groups[s].add(group)
 
-    # Process all sheets and store their data
-    processed_sheets = {}
-    for sheet_name in workbook.sheetnames:
-        sheet = workbook[sheet_name]
-        processed_sheets[sheet_name] = process_sheet(sheet)
-
     # Find all unique students across all processed sheets
     all_students = set()
     
@@ -323,12 +333,6 @@ def generate_individual_timetables(input_filename):
         os.makedirs(output_dir)
         print(f"Created output directory: {output_dir}")
 
-    # Define border style for cells
-    thin_border = Border(
-        left=Side(style='thin'), right=Side(style='thin'),
-        top=Side(style='thin'), bottom=Side(style='thin')
-    )
-
     # Determine start date and camp name based on filename
     start_date = None
     camp_name = ""
@@ -341,6 +345,52 @@ def generate_individual_timetables(input_filename):
 
     print(f"Processing timetables for {camp_name} starting {start_date}")
 
+    # Teacher names and schedule rows of each day, as (time, activities) with times
+    # after 17:00 left out. These do not depend on the student, so the times are
+    # parsed and the cells are stripped once per sheet rather than once per student.
+    sheet_days = {}
+    for sheet_name, sheet_data in processed_sheets.items():
+        teachers = [str(name).strip() for name in sheet_data[0][1:]]
+        timed_rows = []
+        for row in sheet_data[2:]:
+            time_val = row[0]
+            time = ""
+            
+            # Handle different time formats from Excel
+            if isinstance(time_val, datetime.time):
+                time = time_val.strftime('%H:%M')
+            elif isinstance(time_val, datetime.datetime):
+                time = time_val.strftime('%H:%M')
+            elif time_val is not None:
+                time_str = str(time_val).strip()
+                # Try to parse common time formats
+                for fmt in ['%H:%M:%S', '%H:%M', '%I:%M %p', '%I:%M:%S %p']:
+                    try:
+                        parsed_time = datetime.datetime.strptime(time_str, fmt).time()
+                        time = parsed_time.strftime('%H:%M')
+                        break
+                    except ValueError:
+                        continue
+                
+                # If no format worked, use the string as-is if it looks like a time
+                if not time and ':' in time_str:
+                    time = time_str
+
+            # Skip processing if time is empty or invalid
+            if not time or time.strip() == '' or time.lower() in ['none', 'nan']:
+                continue
+
+            # Skip times after 17:00 for all days
+            try:
+                current_time_obj = datetime.datetime.strptime(time, '%H:%M').time()
+                if current_time_obj >= datetime.time(17, 0):
+                    continue
+            except ValueError:
+                pass
+
+            timed_rows.append((time, tuple(str(act).strip() for act in row[1:])))
+        sheet_days[sheet_name] = (teachers, timed_rows)
+
     # Generate timetable for each student
     for student_idx, student in enumerate(sorted(list(all_students)), 1):
         print(f"Processing student {student_idx}/{len(all_students)}: {student}")
@@ -350,56 +400,18 @@ def generate_individual_timetables(input_filename):
         daily_schedules = {}
 
         # Process each day (sheet)
-        for day_index, sheet_name in enumerate(workbook.sheetnames):
+        for day_index, sheet_name in enumerate(sheet_names):
             is_day_6 = (day_index + 1 == 6)
 
             if sheet_name not in processed_sheets:
                 continue
             
-            sheet_data = processed_sheets[sheet_name]
-            teachers = [str(name).strip() for name in sheet_data[0][1:]]
-            schedule_rows = sheet_data[2:]
+            teachers, timed_rows = sheet_days[sheet_name]
             
             student_schedule = []
             day_6_check_in_added = False
 
-            for row in schedule_rows:
-                time_val = row[0]
-                time = ""
-                
-                # Handle different time formats from Excel
-                if isinstance(time_val, datetime.time):
-                    time = time_val.strftime('%H:%M')
-                elif isinstance(time_val, datetime.datetime):
-                    time = time_val.strftime('%H:%M')
-                elif time_val is not None:
-                    time_str = str(time_val).strip()
-                    # Try to parse common time formats
-                    for fmt in ['%H:%M:%S', '%H:%M', '%I:%M %p', '%I:%M:%S %p']:
-                        try:
-                            parsed_time = datetime.datetime.strptime(time_str, fmt).time()
-                            time = parsed_time.strftime('%H:%M')
-                            break
-                        except ValueError:
-                            continue
-                    
-                    # If no format worked, use the string as-is if it looks like a time
-                    if not time and ':' in time_str:
-                        time = time_str
-
-                # Skip processing if time is empty or invalid
-                if not time or time.strip() == '' or time.lower() in ['none', 'nan']:
-                    continue
-
-                # Skip times after 17:00 for all days
-                try:
-                    current_time_obj = datetime.datetime.strptime(time, '%H:%M').time()
-                    if current_time_obj >= datetime.time(17, 0):
-                        continue
-                except ValueError:
-                    pass
-
-                activities = [str(act).strip() for act in row[1:]]
+            for time, activities in timed_rows:
                 activity_found_for_timeslot = False
 
                 # Special handling for Day 6
@@ -593,9 +605,11 @@ def generate_individual_timetables(input_filename):
         sorted_times = sorted(list(all_time_slots))
         time_to_row = {time: i + 4 for i, time in enumerate(sorted_times)}
 
-        student_wb = Workbook()
-        student_ws = student_wb.active
-        student_ws.title = "Full Timetable"
+        # The sheet is laid out as {(row, column): (value, font)} cells and 1-based
+        # (min_row, min_col, max_row, max_col) merged ranges, then written row by row
+        # in write-only mode. Positions with no cell are written blank.
+        cells = {}
+        merges = []
 
         # Add student name in row 1
         # If we have a mapping from student ID to name, try to use it
@@ -613,16 +627,16 @@ def generate_individual_timetables(input_filename):
                     student_name = mapped_name
                     break
         
-        student_ws.cell(row=1, column=1, value=student_name).font = Font(bold=True, size=28)
+        cells[1, 1] = (student_name, TITLE_FONT)
         
         # Add time column header
-        student_ws.cell(row=3, column=1, value="Time").font = Font(bold=True, size=20)
+        cells[3, 1] = ("Time", BOLD_FONT)
         for i, time in enumerate(sorted_times):
-            student_ws.cell(row=i + 4, column=1, value=time).font = Font(size=20)
+            cells[i + 4, 1] = (time, REGULAR_FONT)
 
         # Add daily schedules
         current_col = 2
-        for day_index, sheet_name in enumerate(workbook.sheetnames):
+        for day_index, sheet_name in enumerate(sheet_names):
             if sheet_name not in daily_schedules:
                 continue
             
@@ -633,7 +647,7 @@ def generate_individual_timetables(input_filename):
             else:
                 header_text = sheet_name
             
-            student_ws.cell(row=2, column=current_col, value=header_text).font = Font(bold=True, size=20)
+            cells[2, current_col] = (header_text, BOLD_FONT)
 
             todays_schedule = daily_schedules[sheet_name]
             merged_cells_in_col = set()
@@ -682,51 +696,47 @@ def generate_individual_timetables(input_filename):
                         cell_activity = cell_activity.replace(r_name, r_number)
 
                 # Set cell value
-                cell = student_ws.cell(row=start_row, column=current_col, value=cell_activity)
+                cells[start_row, current_col] = (cell_activity, REGULAR_FONT)
 
                 # Merge cells for consecutive identical activities
                 if row_span > 1:
                     end_row = start_row + row_span - 1
-                    student_ws.merge_cells(start_row=start_row, start_column=current_col, end_row=end_row, end_column=current_col)
+                    merges.append((start_row, current_col, end_row, current_col))
                     for r in range(start_row, end_row + 1):
                         merged_cells_in_col.add(r)
 
             current_col += 1
 
         # Merge student name across all columns in row 1
-        student_ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=current_col-1)
+        merges.append((1, 1, 1, current_col - 1))
+        # Merged ranges can extend past the last written row
+        row_count = max(max(row for row, _ in cells), max(merge[2] for merge in merges))
+
+        # In write-only mode column widths and row heights must be set before the
+        # first row is written, and rows are written in order
+        student_wb = Workbook(write_only=True)
+        student_ws = student_wb.create_sheet("Full Timetable")
 
         # Set column widths and row heights
-        for column in student_ws.columns:
-            column_letter = get_column_letter(column[0].column)
-            column_number = column[0].column
-            
-            if column_number == 1:  # Time column
-                student_ws.column_dimensions[column_letter].width = 15
-            else:  # Date columns
-                student_ws.column_dimensions[column_letter].width = 80
+        student_ws.column_dimensions['A'].width = 15  # Time column
+        for column_number in range(2, current_col):  # Date columns
+            student_ws.column_dimensions[get_column_letter(column_number)].width = 80
             
         # Set row heights
         student_ws.row_dimensions[1].height = 50  # Student name header
         student_ws.row_dimensions[2].height = 30  # Date headers
-        for row_index in range(3, student_ws.max_row + 1):
+        for row_index in range(3, row_count + 1):
             student_ws.row_dimensions[row_index].height = 60  # Time and data rows
 
-        # Apply borders, alignment, and fonts
-        for row in student_ws.iter_rows(min_row=1, max_row=student_ws.max_row, min_col=1, max_col=student_ws.max_column):
-            for cell in row:
-                cell.border = thin_border
-                cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-                
-                # Preserve student name font size
-                if cell.row == 1 and cell.column == 1:
-                    continue
-                
-                # Apply appropriate font size
-                if cell.font and cell.font.bold:
-                    cell.font = Font(bold=True, size=20)
-                else:
-                    cell.font = Font(size=20)
+        for min_row, min_col, max_row, max_col in merges:
+            student_ws.merged_cells.add(CellRange(min_col=min_col, min_row=min_row, max_col=max_col, max_row=max_row))
+
+        # Every cell, including blank and merged ones, gets the border, alignment and a font
+        for row_index in range(1, row_count + 1):
+            student_ws.append([
+                styled_cell(student_ws, *cells.get((row_index, column_index), (None, REGULAR_FONT)))
+                for column_index in range(1, current_col)
+            ])
 
         # Save files
         sanitized_file_name = sanitize_filename(student_name)
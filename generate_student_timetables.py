@@ -1,17 +1,67 @@
 import re
 import os
-import itertools
+import sys
+import json
+import hashlib
 import datetime
-import csv
-from openpyxl import load_workbook, Workbook
+from concurrent.futures import ProcessPoolExecutor
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Alignment, Font, Border, Side
 from openpyxl.utils import get_column_letter
-from shared_utils import sanitize_filename, process_sheet, load_student_name_mapping, load_room_no_mapping
+from openpyxl.worksheet.cell_range import CellRange
+from shared_utils import sanitize_filename, load_processed_sheets, load_student_name_mapping, load_room_no_mapping, compile_replacement_pattern, read_csv_columns
 
 # PDF conversion imports
 import win32com.client as win32
 import pythoncom
 
+# Shared style objects; openpyxl styles are immutable, so one instance can be assigned to every cell
+THIN_BORDER = Border(
+    left=Side(style='thin'),
+    right=Side(style='thin'),
+    top=Side(style='thin'),
+    bottom=Side(style='thin')
+)
+CENTER_WRAP = Alignment(horizontal='center', vertical='center', wrap_text=True)
+TITLE_FONT = Font(bold=True, size=28)
+BOLD_FONT = Font(bold=True, size=20)
+REGULAR_FONT = Font(size=20)
+
+# Sidecar file in the output directory recording the content hash of each written workbook
+HASHES_FILENAME = '.hashes.json'
+
+# Activities shown on every student's timetable; a cell is a common activity if it contains any of them
+COMMON_ACTIVITIES = [
+    "Welcome",
+    "Lunch",
+    "Break",
+    "Ensemble Coaching",
+    "Workshop",
+    "Toilet Break",
+    "Rehearsal for Students and Friends Concert",
+    "Lina Summer Camp of Music Students & Friends Concert",
+    "After concert refreshment (Maritime Museum)",
+    "Group Activity",
+    "Briefing for Saturday",
+    "Yoga Class",
+    "Harp Regulation Workshop",
+    "Harp Regulation Class",
+    "Harp Regulation",
+    "Cello Regulation & Maintenance Class",
+    "Workshop - Warm Up",
+    "Cello MasterClass",
+    "MasterClass",
+    "Flute MasterClass",
+    "Harp MasterClass"
+]
+# Matches a cell containing any common activity, so all of them are checked in one search
+COMMON_ACTIVITY_PATTERN = re.compile('|'.join(re.escape(activity) for activity in COMMON_ACTIVITIES))
+
+# Students finish at 17:00; on Day 6 the last half hour is a free time block
+FINISH_TIME = datetime.time(17, 0)
+DAY_6_FREE_TIME_START = datetime.time(16, 30)
+
 def convert_excel_to_pdf(xlsx_file_path, pdf_file_path):
     """
     Convert Excel file to PDF using Excel COM automation.
@@ -94,18 +144,17 @@ def load_group_mappings(filename, music_instrument):
     It extracts student IDs (e.g., F1) from the 'student_no' column.
     """
     group_mappings = {}
+    # Student IDs of the instrument (e.g., F1, F23), compiled once for all rows
+    instrument_prefix = music_instrument[0].upper()
+    student_id_pattern = re.compile(rf'\b{instrument_prefix}\d+\b')
     try:
         with open(filename, mode='r', encoding='utf-8-sig') as infile:
-            reader = csv.DictReader(infile)
-            for row in reader:
-                group_number = row.get('group_number')
-                student_nos_str = row.get('student_no')
-
+            for group_number, student_nos_str in read_csv_columns(infile, 'group_number', 'student_no'):
                 if group_number and student_nos_str:
-                    group_name = f"Group {group_number.strip()}"
+                    # Group names are interned, like the cell text they are compared with
+                    group_name = sys.intern(f"Group {group_number.strip()}")
                     # Extract all F-numbers (e.g., F1, F23) from the string
-                    instrument_prefix = music_instrument[0].upper()
-                    found_students = re.findall(rf'\b{instrument_prefix}\d+\b', student_nos_str)
+                    found_students = student_id_pattern.findall(student_nos_str)
                     
                     if found_students:
                         if group_name not in group_mappings:
@@ -126,10 +175,7 @@ def load_room_mapping(filename):
     room_mappings = {}
     try:
         with open(filename, mode='r', encoding='utf-8-sig') as infile:
-            reader = csv.DictReader(infile)
-            for row in reader:
-                teacher_name = row.get('teacher_name')
-                room_number = row.get('room_name')
+            for teacher_name, room_number in read_csv_columns(infile, 'teacher_name', 'room_name'):
                 if teacher_name and room_number:
                     room_mappings[teacher_name.strip()] = room_number.strip()
     except FileNotFoundError:
@@ -139,6 +185,413 @@ def load_room_mapping(filename):
     
     return room_mappings
 
+def styled_cell(worksheet, value=None, font=REGULAR_FONT):
+    """
+    Creates a write-only cell with the shared border, alignment and font.
+    """
+    cell = WriteOnlyCell(worksheet, value=value)
+    cell.border = THIN_BORDER
+    cell.alignment = CENTER_WRAP
+    cell.font = font
+    return cell
+
+def parse_group_activity(activity):
+    """
+    Splits a multi-group activity such as "Group 1, 3 Acting Class" into the
+    frozenset of groups involved ({"Group 1", "Group 3"}) and the activity name.
+    """
+    activity_body = activity[len('Group'):].strip()
+    
+    parts = activity_body.replace(',', ' ').split()
+    
+    group_numbers = []
+    activity_name_parts = []
+    for part in parts:
+        if part.isdigit():
+            group_numbers.append(part)
+        else:
+            activity_name_parts.append(part)
+    
+    activity_name = ' '.join(activity_name_parts).strip()
+    involved_groups = frozenset(sys.intern(f"Group {num}") for num in group_numbers)
+    return involved_groups, activity_name
+
+def format_time_label(time_val):
+    """
+    Returns the "HH:MM" label of a time cell, handling the different time
+    formats from Excel. Text that is not a known time format is returned as-is
+    if it looks like a time, otherwise an empty string is returned.
+    """
+    time = ""
+    
+    # Handle different time formats from Excel
+    if isinstance(time_val, datetime.time):
+        time = time_val.strftime('%H:%M')
+    elif isinstance(time_val, datetime.datetime):
+        time = time_val.strftime('%H:%M')
+    elif time_val is not None:
+        time_str = str(time_val).strip()
+        # Try to parse common time formats
+        for fmt in ['%H:%M:%S', '%H:%M', '%I:%M %p', '%I:%M:%S %p']:
+            try:
+                parsed_time = datetime.datetime.strptime(time_str, fmt).time()
+                time = parsed_time.strftime('%H:%M')
+                break
+            except ValueError:
+                continue
+        
+        # If no format worked, use the string as-is if it looks like a time
+        if not time and ':' in time_str:
+            time = time_str
+
+    return time
+
+# Data shared by every student of the file being processed, set in each worker process
+STUDENT_CONTEXT = {}
+
+def init_student_worker(context):
+    """
+    Stores the data shared by all students of a file in a worker process.
+    """
+    STUDENT_CONTEXT.update(context)
+
+def write_student_timetable(student, xlsx_file_path, previous_hash=None):
+    """
+    Builds the timetable workbook of a single student from the data shared
+    through STUDENT_CONTEXT and saves it to xlsx_file_path. Runs in a worker process.
+    Returns a hash of the sheet's content; when it equals previous_hash and the
+    file already exists, the unchanged workbook is not written again.
+    """
+    sheet_names = STUDENT_CONTEXT['sheet_names']
+    sheet_days = STUDENT_CONTEXT['sheet_days']
+    shared_schedules = STUDENT_CONTEXT['shared_schedules']
+    group_activities = STUDENT_CONTEXT['group_activities']
+    lowered_activities = STUDENT_CONTEXT['lowered_activities']
+    unmatched_days = STUDENT_CONTEXT['unmatched_days']
+    sorted_times = STUDENT_CONTEXT['sorted_times']
+    time_to_row = STUDENT_CONTEXT['time_to_row']
+    skeleton_cells = STUDENT_CONTEXT['skeleton_cells']
+    music_instrument = STUDENT_CONTEXT['music_instrument']
+    student_name_map = STUDENT_CONTEXT['student_name_map']
+    student_to_groups = STUDENT_CONTEXT['student_to_groups']
+    room_mapping_teachers = STUDENT_CONTEXT['room_mapping_teachers']
+    room_mappings = STUDENT_CONTEXT['room_mappings']
+    room_mappings_by_lower = STUDENT_CONTEXT['room_mappings_by_lower']
+    room_no_map = STUDENT_CONTEXT['room_no_map']
+    room_no_pattern = STUDENT_CONTEXT['room_no_pattern']
+    student_id_list_pattern = STUDENT_CONTEXT['student_id_list_pattern']
+
+    # Matches the student's ID as a whole word, compiled once for all of the student's cells
+    student_pattern = re.compile(r'\b' + re.escape(student) + r'\b')
+    student_groups = student_to_groups.get(student, set())
+
+    # Pre-process to gather the daily schedules for the student
+    daily_schedules = {}
+
+    # sheet_names keeps the workbook's sheet order, which is the order of days
+    for day_index, sheet_name in enumerate(sheet_names):
+        if sheet_name in shared_schedules:
+            daily_schedules[sheet_name] = shared_schedules[sheet_name]
+            continue
+
+        # A day that never names the student, and has no group activities the student
+        # could be in, needs no matching: its rows all fall back to common activities
+        mentioned_students, has_group_activities, unmatched_schedule = unmatched_days[sheet_name]
+        if student not in mentioned_students and not (student_groups and has_group_activities):
+            daily_schedules[sheet_name] = unmatched_schedule
+            continue
+        
+        teachers, timed_rows = sheet_days[sheet_name]
+        
+        student_schedule = []
+        
+        is_friday = (day_index == 4)
+        is_harp = music_instrument.lower() == 'harp'
+
+        for time, activities, student_columns, group_columns, common_cells in timed_rows:
+            activity_found_for_timeslot = False
+
+            # Run the specific matching logic on the cells that can match the student:
+            # group activities, if the student is in a group, and the first cell naming
+            # the student, which always matches
+            candidate_columns = group_columns if student_groups else []
+            student_column = student_columns.get(student)
+            if student_column is not None:
+                candidate_columns = sorted({*candidate_columns, student_column})
+            for i in candidate_columns:
+                activity = activities[i]
+                activity_lower = lowered_activities[activity]
+                is_group_activity = activity_lower.startswith('group')
+
+                # Generalized logic for any Masterclass containing student's ID
+                if not activity_found_for_timeslot and 'masterclass' in activity_lower and student_pattern.search(activity):
+                    teacher = None
+                    # Try to find a teacher from the mapping directly in the activity string
+                    # Iterate a sorted list of teacher names (longest first) to avoid substring conflicts
+                    for known_teacher in room_mapping_teachers:
+                        if known_teacher in activity:
+                            teacher = known_teacher
+                            break
+                    
+                    # Fallback to header if no teacher found in string (less reliable)
+                    if not teacher:
+                        teacher = teachers[i]
+
+                    room_number = room_mappings.get(teacher, "TBD")
+
+                    # Remove all student IDs (e.g., H1, F12) from the activity string
+                    base_activity = student_id_list_pattern.sub('', activity).strip()
+                    
+                    # Also remove any existing room string, since we'll add the correct one from the mapping
+                    base_activity = re.sub(r'\s*\([^)]+\)$', '', base_activity).strip()
+
+                    desc = f"{base_activity}\n({room_number})"
+                    
+                    student_schedule.append((time, desc))
+                    activity_found_for_timeslot = True
+
+                # Priority 1: Direct student match (will be skipped if the above logic runs)
+                if not activity_found_for_timeslot and student_pattern.search(activity):
+                    cleaned_activity = student_pattern.sub('', activity).strip()
+                    is_private_lesson = (activity.strip() == student) or ('private lesson' in cleaned_activity.lower())
+                    
+                    # Check for "Lesson with {teacher} & pianist" pattern
+                    pianist_lesson_match = re.search(r'lesson with (.+?) & pianist', cleaned_activity.lower())
+                    if pianist_lesson_match:
+                        # Extract teacher name from the original activity (not cleaned_activity) to preserve exact formatting
+                        original_match = re.search(r'lesson with (.+?) & pianist', activity, re.IGNORECASE)
+                        if original_match:
+                            teacher_name = original_match.group(1).strip()
+                        else:
+                            teacher_name = pianist_lesson_match.group(1).strip()
+                        # Use the column header teacher's room instead of the teacher mentioned in the activity
+                        column_teacher = teachers[i]
+                        teacher_room = room_mappings.get(column_teacher, "TBD")
+                        
+                        desc = f"Private Lesson with {teacher_name} & pianist\n({teacher_room})"
+                        student_schedule.append((time, desc))
+                        activity_found_for_timeslot = True
+                    elif is_private_lesson:
+                        teacher = teachers[i]
+                        if teacher:
+                            # Case-insensitive room mapping lookup
+                            room_number = room_mappings_by_lower.get(teacher.lower(), "")
+                            if not room_number:
+                                room_number = room_mappings.get(teacher, "")
+                            
+                            # If the activity was just the student ID, create a default description.
+                            # Otherwise, use the cleaned activity text which might contain more details.
+                            if not cleaned_activity:
+                                desc = f"Private Lesson with {teacher}"
+                            else:
+                                desc = cleaned_activity
+                            
+                            if room_number:
+                                desc += f"\n({room_number})"
+                        else:
+                            # Fallback if no teacher is specified in the column for a private lesson
+                            desc = f"Practice\n({music_instrument} practice room)"
+                        student_schedule.append((time, desc))
+                    else:
+                        # It's some other activity involving the student (e.g., a duet or practice)
+                        if cleaned_activity.lower() == 'practice':
+                            cleaned_activity = f"Practice\n({music_instrument} practice room)"
+                        student_schedule.append((time, cleaned_activity))
+                    activity_found_for_timeslot = True
+
+                # Priority 2: Complex group match
+                if not activity_found_for_timeslot and is_group_activity and "," in activity:
+                    involved_groups, activity_name = group_activities[activity]
+
+                    if not student_groups.isdisjoint(involved_groups):
+                        if 'acting class' in activity_name.lower():
+                            # Use the room mapping to find the correct room for acting class
+                            acting_room = room_mappings.get("Room Acting Class", "Room Acting Class")
+                            student_schedule.append((time, f"Acting Class\n({acting_room})"))
+                        else:
+                            # If the activity name already implies it's a group or has a room, don't add "(Group)"
+                            if 'group' in activity_name.lower() or 'room' in activity_name.lower():
+                                student_schedule.append((time, activity_name))
+                            else:
+                                student_schedule.append((time, f"{activity_name}\n(Group)"))
+                        activity_found_for_timeslot = True
+
+                # Priority 3: Simple group match (e.g., "Group 1")
+                if not activity_found_for_timeslot and is_group_activity:
+                    # New logic for group activities
+                    for group_name in student_groups:
+                        if activity.startswith(group_name):
+                            room_match = re.search(r'\(Room\s+(.+?)\)', activity, re.IGNORECASE)
+                            if room_match:
+                                room_name = room_match.group(1)
+                                student_schedule.append((time, f"Ensemble\n(Room {room_name})"))
+                            else:
+                                teacher = teachers[i]
+                                # Case-insensitive room mapping lookup
+                                room_number = room_mappings_by_lower.get(teacher.lower(), "TBD")
+                                if room_number == "TBD":
+                                    room_number = room_mappings.get(teacher, "TBD")
+                                student_schedule.append((time, f"Ensemble\n({room_number})"))
+                            activity_found_for_timeslot = True
+                            break  # Found a match, no need to check other groups
+        
+            # Fallback for common activities or Free Time
+            if not activity_found_for_timeslot:
+                # Check for any common activity for this timeslot.
+                activity_to_add = None
+                for activity, masterclass_students in common_cells:
+                    # Skip MasterClass activities that contain specific student IDs but don't include current student
+                    if masterclass_students is None or student in masterclass_students:
+                        activity_to_add = activity
+                        break  # Found a common activity
+
+                if activity_to_add:
+                    student_schedule.append((time, activity_to_add))
+                else:
+                    # Debug output for student C1 - no activity found at all
+                    student_schedule.append((time, ""))
+
+        # Sort the schedule by time to ensure correct grouping for merging
+        student_schedule.sort(key=lambda x: x[0])
+
+        daily_schedules[sheet_name] = student_schedule
+
+    # The sheet is laid out as {(row, column): (value, font)} cells and 1-based
+    # (min_row, min_col, max_row, max_col) merged ranges, then written row by row
+    # in write-only mode. Positions with no cell are written blank. The header
+    # and time column cells come from the skeleton shared by all students.
+    cells = dict(skeleton_cells)
+    merges = []
+
+    # Add student name in row 1, merged across all columns
+    student_name = student_name_map.get(student, student)
+    cells[1, 1] = (student_name, TITLE_FONT)
+
+    # Every day has a schedule, so day columns follow the order of sheet_names
+    current_col = 2
+    for sheet_name in sheet_names:
+        todays_schedule = daily_schedules[sheet_name]
+        
+        # Keep track of merged cells to avoid writing to them again
+        merged_cells_in_col = set()
+
+        # Calculate row_span for merging: the length of the run of equal activities
+        # starting at each entry, counted backwards in a single pass over the day
+        run_lengths = [1] * len(todays_schedule)
+        for idx in range(len(todays_schedule) - 2, -1, -1):
+            if todays_schedule[idx + 1][1] == todays_schedule[idx][1]:
+                run_lengths[idx] = run_lengths[idx + 1] + 1
+
+        for idx, (time, activity) in enumerate(todays_schedule):
+            if time not in time_to_row:
+                continue
+            
+            start_row = time_to_row[time]
+            
+            if start_row in merged_cells_in_col:
+                continue
+
+            row_span = run_lengths[idx]
+            
+            cell_activity = activity
+            if activity == "DAY_6_FREE_TIME_BLOCK":
+                cell_activity = ""
+            
+            # Empty cells have nothing to format or replace
+            if cell_activity:
+                # Ensure room information is always on a separate line
+                # Look for room patterns and move them to new lines if they're not already
+                room_patterns = [
+                    r'\s*(\(Room\s+[^)]+\))',  # (Room 246), (Room UG24), etc.
+                    r'\s*(\([A-Z]{1,3}\d+[A-Z]?\))',  # (UG24), (LG1), (B123), etc.
+                    r'\s*(\([^)]*room[^)]*\))',  # Any parentheses containing "room"
+                    r'\s*(\(Group\))',  # (Group)
+                    r'\s*(\([^)]*practice\s+room[^)]*\))'  # Practice room references
+                ]
+            
+                for pattern in room_patterns:
+                    # Replace inline room info with newline + room info
+                    cell_activity = re.sub(pattern, r'\n\1', cell_activity, flags=re.IGNORECASE)
+            
+                # Handle "or" separately with more flexible pattern and proper formatting
+                # Match "or" with optional spaces around it, ensuring proper line breaks
+                cell_activity = re.sub(r'\s*\bor\b\s*', '\nor\n', cell_activity, flags=re.IGNORECASE)
+            
+                # Clean up any double newlines or leading/trailing whitespace
+                cell_activity = re.sub(r'\n+', '\n', cell_activity).strip()
+            
+                # Replace room names with room numbers, in a single pass
+                if room_no_pattern:
+                    cell_activity = room_no_pattern.sub(lambda match: room_no_map[match.group(0)], cell_activity)
+
+            cells[start_row, current_col] = (cell_activity, REGULAR_FONT)
+
+            if row_span > 1:
+                end_row = start_row + row_span - 1
+                merges.append((start_row, current_col, end_row, current_col))
+                # Mark cells as merged
+                for r in range(start_row, end_row + 1):
+                    merged_cells_in_col.add(r)
+
+        current_col += 1
+
+    # Merge student name across all columns in row 1
+    merges.append((1, 1, 1, current_col - 1))
+    # Merged ranges can extend past the last written row
+    row_count = max(max(row for row, _ in cells), max(merge[2] for merge in merges))
+
+    # The cells and merges determine everything that is written, so an existing
+    # workbook with the same content hash is left as it is
+    content_hash = hashlib.blake2b(
+        repr((sorted((position, value, font.b, font.sz) for position, (value, font) in cells.items()), merges)).encode(),
+        digest_size=16,
+    ).hexdigest()
+    if content_hash == previous_hash and os.path.exists(xlsx_file_path):
+        return content_hash
+
+    # In write-only mode column widths and row heights must be set before the
+    # first row is written, and rows are written in order
+    student_wb = Workbook(write_only=True)
+    student_ws = student_wb.create_sheet("Full Timetable")
+
+    # Set column widths: Time column auto-fit, date columns set to 80.
+    # The Time column only holds the student name, "Time" and the time slots,
+    # so it is fitted from those values rather than by walking the sheet's columns.
+    max_length = max(len(line) for value in (student_name, "Time", *sorted_times) if value for line in str(value).split('\n'))
+
+    # Set reasonable width for time column
+    font_size_factor = 1.3
+    padding = 2
+    if max_length > 0:
+        adjusted_width = max(max_length * font_size_factor + padding, 15)
+        adjusted_width = min(adjusted_width, 25)  # Reasonable max for time column
+    else:
+        adjusted_width = 15
+    student_ws.column_dimensions['A'].width = adjusted_width
+    # Date columns (Monday to Saturday)
+    for column_number in range(2, current_col):
+        student_ws.column_dimensions[get_column_letter(column_number)].width = 80
+        
+    # Set specific row heights as requested
+    student_ws.row_dimensions[1].height = 50  # Student name header
+    student_ws.row_dimensions[2].height = 30  # Date headers
+    for row_index in range(3, row_count + 1):
+        student_ws.row_dimensions[row_index].height = 60  # Time and data rows
+
+    for min_row, min_col, max_row, max_col in merges:
+        student_ws.merged_cells.add(CellRange(min_col=min_col, min_row=min_row, max_col=max_col, max_row=max_row))
+
+    # Every cell, including blank and merged ones, gets the border, alignment and a font
+    for row_index in range(1, row_count + 1):
+        student_ws.append([
+            styled_cell(student_ws, *cells.get((row_index, column_index), (None, REGULAR_FONT)))
+            for column_index in range(1, current_col)
+        ])
+
+    # Save Excel file
+    student_wb.save(xlsx_file_path)
+    return content_hash
+
 def generate_timetables(input_filename):
     """
     Reads an Excel file with multiple sheets (each representing a date) and
@@ -158,9 +611,9 @@ def generate_timetables(input_filename):
     camp_part = camp_match.group(1) # e.g., 'campA' - preserve original case
     
     try:
-        # Load the workbook once to process all sheets.
-        # data_only=True ensures we get cell values instead of formulas.
-        workbook = load_workbook(input_filename, data_only=True)
+        # Load the workbook once and process all sheets, streaming the cell values only.
+        # Sheet data has merged cells filled in and is keyed by sheet name in workbook order.
+        processed_sheets = load_processed_sheets(input_filename)
         print(f"\nProcessing student timetables for {basename}...")
     except FileNotFoundError:
         # This case is less likely now but good to keep as a safeguard
@@ -175,9 +628,17 @@ def generate_timetables(input_filename):
     student_name_map = load_student_name_mapping(student_mapping_file)
     group_mappings = load_group_mappings(group_mapping_file, music_instrument)
     room_mappings = load_room_mapping(room_mapping_file)
+    # Teacher names looked up in cells and headers, prepared once per file: longest
+    # first to avoid substring conflicts, and lowercased for case-insensitive lookups
+    # (the first mapping wins when two names differ only in case)
+    room_mapping_teachers = sorted(room_mappings.keys(), key=len, reverse=True)
+    room_mappings_by_lower = {}
+    for mapped_teacher, room in room_mappings.items():
+        room_mappings_by_lower.setdefault(mapped_teacher.lower(), room)
     
     room_no_mapping_file = os.path.join("input", f"room_no_mapping-{camp_part}.csv")
     room_no_map = load_room_no_mapping(room_no_mapping_file)
+    room_no_pattern = compile_replacement_pattern(room_no_map)
     
     # Create a reverse mapping from student to their groups for efficient lookup
     student_to_groups = {}
@@ -187,61 +648,27 @@ def generate_timetables(input_filename):
                 student_to_groups[s] = set()
             student_to_groups[s].add(group)
 
-    # Process all sheets and store their data in a dictionary
-    processed_sheets = {}
-    for sheet_name in workbook.sheetnames:
-        sheet = workbook[sheet_name]
-        processed_sheets[sheet_name] = process_sheet(sheet)
-
-    # Find all unique students across all processed sheets
-    all_students = set()
-    for sheet_name, sheet_data in processed_sheets.items():
-        schedule_rows = sheet_data[2:]  # Schedule data starts from the third row
-        for row in schedule_rows:
-            for cell in row[1:]:
-                if isinstance(cell, str):
-                    # Use regex to find all student IDs (e.g., F1) in a cell
-                    instrument_prefix = music_instrument[0].upper()
-                    found_students = re.findall(rf'\b{instrument_prefix}\d+\b', cell)
-                    for s in found_students:
-                        all_students.add(s)
-
-    common_activities = [
-        "Welcome",
-        "Lunch",
-        "Break",
-        "Ensemble Coaching",
-        "Workshop",
-        "Toilet Break",
-        "Rehearsal for Students and Friends Concert",
-        "Lina Summer Camp of Music Students & Friends Concert",
-        "After concert refreshment (Maritime Museum)",
-        "Group Activity",
-        "Briefing for Saturday",
-        "Yoga Class",
-        "Harp Regulation Workshop",
-        "Harp Regulation Class",
-        "Harp Regulation",
-        "Cello Regulation & Maintenance Class",
-        "Workshop - Warm Up",
-        "Cello MasterClass",
-        "MasterClass",
-        "Flute MasterClass",
-        "Harp MasterClass"
-    ]
+    # Student IDs (e.g., F1) in a cell, compiled once per file
+    student_id_pattern = re.compile(rf'\b{music_instrument[0].upper()}\d+\b')
+    # A student ID with the comma and spaces that follow it, removed from masterclass descriptions
+    student_id_list_pattern = re.compile(rf'\b{music_instrument[0].upper()}\d+\b,?\s*')
+
+    # Find all unique students across all processed sheets (schedule data starts from the third row).
+    # The text cells are joined with newlines, which no ID can span, and scanned in a single call.
+    schedule_text = '\n'.join(
+        cell
+        for sheet_data in processed_sheets.values()
+        for row in sheet_data[2:]
+        for cell in row[1:]
+        if isinstance(cell, str)
+    )
+    all_students = set(student_id_pattern.findall(schedule_text))
+
 
     output_dir = "student_timetables"
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    # Define border style
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-
     # Determine start date and camp name based on filename
     start_date = None
     camp_name = ""
@@ -252,445 +679,209 @@ def generate_timetables(input_filename):
         start_date = datetime.date(2025, 7, 21)
         camp_name = "CampB"
 
-    # Generate one single-sheet Excel file for each student
-    for student in sorted(list(all_students)):
-        # Pre-process to gather all time slots and daily schedules for the student
-        all_time_slots = set()
-        daily_schedules = {}
-
-        # Using workbook.sheetnames to preserve the order of days
-        for day_index, sheet_name in enumerate(workbook.sheetnames):
-            is_day_6 = (day_index + 1 == 6)
-
-            if sheet_name not in processed_sheets:
+    # Teacher names and time-labelled schedule rows of each day. These do not depend on
+    # the student, so the header is stripped, the times are parsed and the cells are
+    # indexed once per sheet. A row is kept as (time, activities, student_columns,
+    # group_columns, common_cells): student_columns maps each student ID to the first
+    # column naming it and group_columns lists the group activity columns. Only those
+    # cells can match a student, so each student is checked against them instead of
+    # against every cell. common_cells lists the row's common activities in column
+    # order, for the fallback, each with the IDs of the students a masterclass is
+    # limited to (None when it is open to everyone). Rows past the students' finish
+    # time are left out, and activities is None for the Day 6 free time block.
+    sheet_days = {}
+    # Schedules that are the same for every student, by sheet name
+    shared_schedules = {}
+    # Students named on each other day, whether it has group activities, and the
+    # schedule of students it does not name, by sheet name
+    unmatched_days = {}
+    # Groups and name of each multi-group activity ("Group 1, 3 ..."), parsed once per distinct cell
+    group_activities = {}
+    # Lowercased text of each distinct activity, for the case-insensitive checks
+    lowered_activities = {}
+    for day_index, (sheet_name, sheet_data) in enumerate(processed_sheets.items()):
+        teachers = [str(name).strip() for name in sheet_data[0][1:]]
+        timed_rows = []
+        for row in sheet_data[2:]:
+            time = format_time_label(row[0])
+
+            # Skip processing if time is empty or invalid
+            if not time or time.strip() == '' or time.lower() in ['none', 'nan']:
                 continue
-            
-            sheet_data = processed_sheets[sheet_name]
-            teachers = [str(name).strip() for name in sheet_data[0][1:]]
-            schedule_rows = sheet_data[2:]
-            
-            student_schedule = []
-            day_6_check_in_added = False  # Flag to ensure it's added only once
-            
-            is_friday = (day_index == 4)
-            is_harp = music_instrument.lower() == 'harp'
-
-            for row in schedule_rows:
-                time_val = row[0]
-                time = ""
-                
-                # Handle different time formats from Excel
-                if isinstance(time_val, datetime.time):
-                    time = time_val.strftime('%H:%M')
-                elif isinstance(time_val, datetime.datetime):
-                    time = time_val.strftime('%H:%M')
-                elif time_val is not None:
-                    time_str = str(time_val).strip()
-                    # Try to parse common time formats
-                    for fmt in ['%H:%M:%S', '%H:%M', '%I:%M %p', '%I:%M:%S %p']:
-                        try:
-                            parsed_time = datetime.datetime.strptime(time_str, fmt).time()
-                            time = parsed_time.strftime('%H:%M')
-                            break
-                        except ValueError:
-                            continue
-                    
-                    # If no format worked, use the string as-is if it looks like a time
-                    if not time and ':' in time_str:
-                        time = time_str
 
-                # Skip processing if time is empty or invalid
-                if not time or time.strip() == '' or time.lower() in ['none', 'nan']:
+            # For Day 1-5, students finish at 17:00. For Day 6, they finish at 17:00,
+            # after a 16:30-17:00 free time block. Times are parsed once per row here.
+            if day_index <= 5:
+                try:
+                    current_time_obj = datetime.datetime.strptime(time, '%H:%M').time()
+                except ValueError:
+                    current_time_obj = None  # Not a time format
+                if current_time_obj is not None:
+                    if current_time_obj >= FINISH_TIME:
+                        continue  # Skip this timeslot
+                    if day_index == 5 and current_time_obj >= DAY_6_FREE_TIME_START:
+                        # No activities: the row is the free time block, the same for every student
+                        timed_rows.append((time, None, {}, [], []))
+                        continue
+
+            # Cells are already stripped strings ("" when empty) or other values; only the latter need str()
+            activities = tuple(act if isinstance(act, str) else str(act) for act in row[1:])
+            student_columns = {}
+            for i, activity in enumerate(activities):
+                for student_id in student_id_pattern.findall(activity):
+                    student_columns.setdefault(student_id, i)
+            for activity in activities:
+                if activity not in lowered_activities:
+                    lowered_activities[activity] = activity.lower()
+            group_columns = [i for i, activity in enumerate(activities) if lowered_activities[activity].startswith('group')]
+            for i in group_columns:
+                if "," in activities[i] and activities[i] not in group_activities:
+                    group_activities[activities[i]] = parse_group_activity(activities[i])
+
+            common_cells = []
+            for activity in activities:
+                if activity and COMMON_ACTIVITY_PATTERN.search(activity):
+                    masterclass_students = None
+                    if 'masterclass' in lowered_activities[activity]:
+                        masterclass_students = frozenset(student_id_pattern.findall(activity)) or None
+                    common_cells.append((activity, masterclass_students))
+
+            timed_rows.append((time, activities, student_columns, group_columns, common_cells))
+        sheet_days[sheet_name] = (teachers, timed_rows)
+
+        if day_index == 5:
+            # For Day 6, any activity is considered a common activity for all students,
+            # so the day's schedule is the same for everyone and is built once here
+            day_6_schedule = []
+            day_6_check_in_added = False  # Flag to ensure it's added only once
+            for time, activities, _, _, _ in timed_rows:
+                # The 16:30-17:00 merge block
+                if activities is None:
+                    day_6_schedule.append((time, "DAY_6_FREE_TIME_BLOCK"))
                     continue
 
-                # For Day 1-5, students finish at 17:00. For Day 6, they finish at 17:00.
-                if day_index < 5:  # Day 1 to 5
-                    try:
-                        if datetime.datetime.strptime(time, '%H:%M').time() >= datetime.time(17, 0):
-                            continue  # Skip this timeslot
-                    except ValueError:
-                        pass  # Not a time format
-                elif is_day_6:  # Day 6
-                    try:
-                        current_time_obj = datetime.datetime.strptime(time, '%H:%M').time()
-                        if current_time_obj >= datetime.time(17, 0):
-                            continue  # Skip this timeslot
-                        
-                        # Handle the 16:30-17:00 merge block
-                        if datetime.time(16, 30) <= current_time_obj < datetime.time(17, 0):
-                            student_schedule.append((time, "DAY_6_FREE_TIME_BLOCK"))
-                            continue # Skip other processing for this row
-                    except ValueError:
-                        pass  # Not a time format
-
-                activities = [str(act).strip() for act in row[1:]]
-                activity_found_for_timeslot = False
-
-                if is_day_6:
-                    # For Day 6, any activity is considered a common activity for all students.
-                    # Find the first non-empty activity in the row.
-                    for activity in activities:
-                        if not activity:
-                            continue
-
-                        # Special handling for "Check in" activity
-                        if "Check in Maritime Museum" in activity:
-                            if not day_6_check_in_added:
-                                check_in_activity = "Check in Maritime Museum\nBriefing for Saturday Concert\nMaritime Museum Tour"
-                                student_schedule.extend([
-                                    ("10:00", check_in_activity),
-                                    ("10:15", check_in_activity),
-                                    ("10:30", check_in_activity),
-                                    ("10:45", check_in_activity)
-                                ])
-                                day_6_check_in_added = True
-                            # Once the block is added, we don't need to process this specific activity again.
-                            # We break here to process the next time slot from the source file.
-                            activity_found_for_timeslot = True
-                            break
-                        
-                        # For all other activities on Day 6
-                        student_schedule.append((time, activity))
-                        activity_found_for_timeslot = True
-                        break # Found an activity for this time slot, move to the next.
-                else:
-                    # For all other days, run the specific matching logic.
-                    for i, activity in enumerate(activities):
-                        if not activity:
-                            continue
-
-                        # Generalized logic for any Masterclass containing student's ID
-                        if not activity_found_for_timeslot and 'masterclass' in activity.lower() and re.search(r'\b' + re.escape(student) + r'\b', activity):
-                            teacher = None
-                            # Try to find a teacher from the mapping directly in the activity string
-                            # Iterate a sorted list of teacher names (longest first) to avoid substring conflicts
-                            for known_teacher in sorted(room_mappings.keys(), key=len, reverse=True):
-                                if known_teacher in activity:
-                                    teacher = known_teacher
-                                    break
-                            
-                            # Fallback to header if no teacher found in string (less reliable)
-                            if not teacher:
-                                teacher = teachers[i]
-
-                            room_number = room_mappings.get(teacher, "TBD")
-
-                            # Remove all student IDs (e.g., H1, F12) from the activity string
-                            instrument_prefix = music_instrument[0].upper()
-                            base_activity = re.sub(rf'\b{instrument_prefix}\d+\b,?\s*', '', activity).strip()
-                            
-                            # Also remove any existing room string, since we'll add the correct one from the mapping
-                            base_activity = re.sub(r'\s*\([^)]+\)$', '', base_activity).strip()
-
-                            desc = f"{base_activity}\n({room_number})"
-                            
-                            student_schedule.append((time, desc))
-                            activity_found_for_timeslot = True
-
-                        # Priority 1: Direct student match (will be skipped if the above logic runs)
-                        if not activity_found_for_timeslot and re.search(r'\b' + re.escape(student) + r'\b', activity):
-                            cleaned_activity = re.sub(r'\b' + re.escape(student) + r'\b', '', activity).strip()
-                            is_private_lesson = (activity.strip() == student) or ('private lesson' in cleaned_activity.lower())
-                            
-                            # Check for "Lesson with {teacher} & pianist" pattern
-                            pianist_lesson_match = re.search(r'lesson with (.+?) & pianist', cleaned_activity.lower())
-                            if pianist_lesson_match:
-                                # Extract teacher name from the original activity (not cleaned_activity) to preserve exact formatting
-                                original_match = re.search(r'lesson with (.+?) & pianist', activity, re.IGNORECASE)
-                                if original_match:
-                                    teacher_name = original_match.group(1).strip()
-                                else:
-                                    teacher_name = pianist_lesson_match.group(1).strip()
-                                # Use the column header teacher's room instead of the teacher mentioned in the activity
-                                column_teacher = teachers[i]
-                                teacher_room = room_mappings.get(column_teacher, "TBD")
-                                
-                                desc = f"Private Lesson with {teacher_name} & pianist\n({teacher_room})"
-                                student_schedule.append((time, desc))
-                                activity_found_for_timeslot = True
-                            elif is_private_lesson:
-                                teacher = teachers[i]
-                                if teacher:
-                                    # Case-insensitive room mapping lookup
-                                    room_number = ""
-                                    for mapped_teacher, room in room_mappings.items():
-                                        if mapped_teacher.lower() == teacher.lower():
-                                            room_number = room
-                                            break
-                                    if not room_number:
-                                        room_number = room_mappings.get(teacher, "")
-                                    
-                                    # If the activity was just the student ID, create a default description.
-                                    # Otherwise, use the cleaned activity text which might contain more details.
-                                    if not cleaned_activity:
-                                        desc = f"Private Lesson with {teacher}"
-                                    else:
-                                        desc = cleaned_activity
-                                    
-                                    if room_number:
-                                        desc += f"\n({room_number})"
-                                else:
-                                    # Fallback if no teacher is specified in the column for a private lesson
-                                    desc = f"Practice\n({music_instrument} practice room)"
-                                student_schedule.append((time, desc))
-                            else:
-                                # It's some other activity involving the student (e.g., a duet or practice)
-                                if cleaned_activity.lower() == 'practice':
-                                    cleaned_activity = f"Practice\n({music_instrument} practice room)"
-                                student_schedule.append((time, cleaned_activity))
-                            activity_found_for_timeslot = True
+                # Find the first non-empty activity in the row; empty rows are shown blank
+                activity = next((activity for activity in activities if activity), "")
+
+                # Special handling for "Check in" activity
+                if "Check in Maritime Museum" in activity:
+                    if not day_6_check_in_added:
+                        check_in_activity = "Check in Maritime Museum\nBriefing for Saturday Concert\nMaritime Museum Tour"
+                        day_6_schedule.extend([
+                            ("10:00", check_in_activity),
+                            ("10:15", check_in_activity),
+                            ("10:30", check_in_activity),
+                            ("10:45", check_in_activity)
+                        ])
+                        day_6_check_in_added = True
+                    # Once the block is added, the check in row itself is not shown
+                    continue
 
-                        # Priority 2: Complex group match
-                        if not activity_found_for_timeslot and activity.lower().startswith('group') and "," in activity:
-                            activity_body = activity[len('Group'):].strip()
-                            
-                            parts = activity_body.replace(',', ' ').split()
-                            
-                            group_numbers = []
-                            activity_name_parts = []
-                            for part in parts:
-                                if part.isdigit():
-                                    group_numbers.append(part)
-                                else:
-                                    activity_name_parts.append(part)
-                            
-                            activity_name = ' '.join(activity_name_parts).strip()
-                            involved_groups = {f"Group {num}" for num in group_numbers}
-
-                            student_groups = student_to_groups.get(student, set())
-
-                            if not student_groups.isdisjoint(involved_groups):
-                                if 'acting class' in activity_name.lower():
-                                    # Use the room mapping to find the correct room for acting class
-                                    acting_room = room_mappings.get("Room Acting Class", "Room Acting Class")
-                                    student_schedule.append((time, f"Acting Class\n({acting_room})"))
-                                else:
-                                    # If the activity name already implies it's a group or has a room, don't add "(Group)"
-                                    if 'group' in activity_name.lower() or 'room' in activity_name.lower():
-                                        student_schedule.append((time, activity_name))
-                                    else:
-                                        student_schedule.append((time, f"{activity_name}\n(Group)"))
-                                activity_found_for_timeslot = True
-
-                        # Priority 3: Simple group match (e.g., "Group 1")
-                        if not activity_found_for_timeslot and activity.lower().startswith('group'):
-                            student_groups = student_to_groups.get(student, set())
-                            
-                            # New logic for group activities
-                            for group_name in student_groups:
-                                if activity.startswith(group_name):
-                                    room_match = re.search(r'\(Room\s+(.+?)\)', activity, re.IGNORECASE)
-                                    if room_match:
-                                        room_name = room_match.group(1)
-                                        student_schedule.append((time, f"Ensemble\n(Room {room_name})"))
-                                    else:
-                                        teacher = teachers[i]
-                                        # Case-insensitive room mapping lookup
-                                        room_number = "TBD"
-                                        for mapped_teacher, room in room_mappings.items():
-                                            if mapped_teacher.lower() == teacher.lower():
-                                                room_number = room
-                                                break
-                                        if room_number == "TBD":
-                                            room_number = room_mappings.get(teacher, "TBD")
-                                        student_schedule.append((time, f"Ensemble\n({room_number})"))
-                                    activity_found_for_timeslot = True
-                                    break  # Found a match, no need to check other groups
-                
-                # Fallback for common activities or Free Time
-                if not activity_found_for_timeslot:
-                    # Check for any common activity for this timeslot.
-                    activity_to_add = None
-                    for activity in activities:
-                        if not activity:
-                            continue
-                        
-                        # Skip MasterClass activities that contain specific student IDs but don't include current student
-                        if 'masterclass' in activity.lower():
-                            # Check if this activity contains any student IDs
-                            instrument_prefix = music_instrument[0].upper()
-                            found_students = re.findall(rf'\b{instrument_prefix}\d+\b', activity)
-                            if found_students and student not in found_students:
-                                continue  # Skip this MasterClass as it doesn't include current student
-                        
-                        for common_activity in common_activities:
-                            if common_activity in activity:
-                                activity_to_add = activity
-                                break  # Found a common activity
-                        if activity_to_add:
-                            break
-    
-                    if activity_to_add:
-                        student_schedule.append((time, activity_to_add))
-                    else:
-                        # Debug output for student C1 - no activity found at all
-                        student_schedule.append((time, ""))
+                day_6_schedule.append((time, activity))
 
             # Sort the schedule by time to ensure correct grouping for merging
-            student_schedule.sort(key=lambda x: x[0])
-
-            daily_schedules[sheet_name] = student_schedule
-            for time, _ in student_schedule:
-                all_time_slots.add(time)
-        
-        sorted_times = sorted(list(all_time_slots))
-        time_to_row = {time: i + 4 for i, time in enumerate(sorted_times)}
-
-        student_wb = Workbook()
-        student_ws = student_wb.active
-        student_ws.title = "Full Timetable"
-
-        # Add student name in row 1, merged across all columns
-        student_name = student_name_map.get(student, student)
-        student_ws.cell(row=1, column=1, value=student_name).font = Font(bold=True, size=28)
-        
-        student_ws.cell(row=3, column=1, value="Time").font = Font(bold=True, size=20)
-        for i, time in enumerate(sorted_times):
-            student_ws.cell(row=i + 4, column=1, value=time).font = Font(size=20)
-
-        current_col = 2
-        for day_index, sheet_name in enumerate(workbook.sheetnames):
-            if sheet_name not in daily_schedules:
-                continue
-            
-            if start_date:
-                current_date = start_date + datetime.timedelta(days=day_index)
-                header_text = current_date.strftime('%d %B (%A)')
-            else:
-                header_text = sheet_name
-            
-            student_ws.cell(row=2, column=current_col, value=header_text).font = Font(bold=True, size=20)
-
-            todays_schedule = daily_schedules[sheet_name]
-            
-            # Keep track of merged cells to avoid writing to them again
-            merged_cells_in_col = set()
-
-            for idx, (time, activity) in enumerate(todays_schedule):
-                if time not in time_to_row:
-                    continue
-                
-                start_row = time_to_row[time]
-                
-                if start_row in merged_cells_in_col:
-                    continue
-
-                # Calculate row_span for merging
-                row_span = 1
-                for next_time, next_activity in todays_schedule[idx+1:]:
-                    if next_activity == activity:
-                        row_span += 1
-                    else:
-                        break
-                
-                cell_activity = activity
-                if activity == "DAY_6_FREE_TIME_BLOCK":
-                    cell_activity = ""
-                
-                # Ensure room information is always on a separate line
-                # Look for room patterns and move them to new lines if they're not already
-                room_patterns = [
-                    r'\s*(\(Room\s+[^)]+\))',  # (Room 246), (Room UG24), etc.
-                    r'\s*(\([A-Z]{1,3}\d+[A-Z]?\))',  # (UG24), (LG1), (B123), etc.
-                    r'\s*(\([^)]*room[^)]*\))',  # Any parentheses containing "room"
-                    r'\s*(\(Group\))',  # (Group)
-                    r'\s*(\([^)]*practice\s+room[^)]*\))'  # Practice room references
-                ]
-                
-                for pattern in room_patterns:
-                    # Replace inline room info with newline + room info
-                    cell_activity = re.sub(pattern, r'\n\1', cell_activity, flags=re.IGNORECASE)
-                
-                # Handle "or" separately with more flexible pattern and proper formatting
-                # Match "or" with optional spaces around it, ensuring proper line breaks
-                cell_activity = re.sub(r'\s*\bor\b\s*', '\nor\n', cell_activity, flags=re.IGNORECASE)
-                
-                # Clean up any double newlines or leading/trailing whitespace
-                cell_activity = re.sub(r'\n+', '\n', cell_activity).strip()
-                
-                # Replace room names with room numbers
-                if room_no_map:
-                    for r_name, r_number in room_no_map.items():
-                        cell_activity = cell_activity.replace(r_name, r_number)
-
-                cell = student_ws.cell(row=start_row, column=current_col, value=cell_activity)
-
-                if row_span > 1:
-                    end_row = start_row + row_span - 1
-                    student_ws.merge_cells(start_row=start_row, start_column=current_col, end_row=end_row, end_column=current_col)
-                    # Mark cells as merged
-                    for r in range(start_row, end_row + 1):
-                        merged_cells_in_col.add(r)
-
-            current_col += 1
-
-        # Merge student name across all columns in row 1
-        student_ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=current_col-1)
-
-        # Set column widths: Time column auto-fit, date columns set to 80
-        for column in student_ws.columns:
-            column_letter = get_column_letter(column[0].column)
-            column_number = column[0].column
-            
-            if column_number == 1:  # Time column
-                # Auto-fit time column based on content
-                max_length = 0
-                for cell in column:
-                    try:
-                        if cell.value:
-                            lines = str(cell.value).split('\n')
-                            max_line_length = max(len(line) for line in lines) if lines else 0
-                            if max_line_length > max_length:
-                                max_length = max_line_length
-                    except:
-                        pass
-                
-                # Set reasonable width for time column
-                font_size_factor = 1.3
-                padding = 2
-                if max_length > 0:
-                    adjusted_width = max(max_length * font_size_factor + padding, 15)
-                    adjusted_width = min(adjusted_width, 25)  # Reasonable max for time column
-                else:
-                    adjusted_width = 15
-                student_ws.column_dimensions[column_letter].width = adjusted_width
-            else:  # Date columns (Monday to Saturday)
-                # Set date columns to width 80
-                student_ws.column_dimensions[column_letter].width = 80
-            
-        # Set specific row heights as requested
-        student_ws.row_dimensions[1].height = 50  # Student name header
-        student_ws.row_dimensions[2].height = 30  # Date headers
-        for row_index in range(3, student_ws.max_row + 1):
-            student_ws.row_dimensions[row_index].height = 60  # Time and data rows
-
-
-        # Apply borders, alignment, and font to all cells
-        for row in student_ws.iter_rows(min_row=1, max_row=student_ws.max_row, min_col=1, max_col=student_ws.max_column):
-            for cell in row:
-                cell.border = thin_border
-                cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-                # Skip font modification for student name cell (row 1, column 1) to preserve size 28
-                if cell.row == 1 and cell.column == 1:
-                    continue
-                # Apply 20pt font to all other cells, preserving existing bold formatting if any
-                if cell.font and cell.font.bold:
-                    cell.font = Font(bold=True, size=20)
-                else:
-                    cell.font = Font(size=20)
+            day_6_schedule.sort(key=lambda x: x[0])
+            shared_schedules[sheet_name] = day_6_schedule
+        else:
+            # The schedule of a student the day never names: with no group activities
+            # either, every row falls back to its first common activity open to everyone
+            mentioned_students = set()
+            has_group_activities = False
+            unmatched_schedule = []
+            for time, activities, student_columns, group_columns, common_cells in timed_rows:
+                mentioned_students.update(student_columns)
+                has_group_activities = has_group_activities or bool(group_columns)
+                activity_to_add = next((activity for activity, masterclass_students in common_cells if masterclass_students is None), "")
+                unmatched_schedule.append((time, activity_to_add))
+            unmatched_schedule.sort(key=lambda x: x[0])
+            unmatched_days[sheet_name] = (mentioned_students, has_group_activities, unmatched_schedule)
+
+    # Time slots of every student's timetable, the same for all students: each schedule
+    # row gives every student one entry at its time, and Day 6 uses its shared schedule
+    all_time_slots = set()
+    for sheet_name, (teachers, timed_rows) in sheet_days.items():
+        if sheet_name in shared_schedules:
+            all_time_slots.update(time for time, _ in shared_schedules[sheet_name])
+        else:
+            all_time_slots.update(time for time, *_ in timed_rows)
+    sorted_times = sorted(all_time_slots)
+    time_to_row = {time: i + 4 for i, time in enumerate(sorted_times)}
+
+    # Header text of each day's column, the same for every student
+    day_headers = [
+        (start_date + datetime.timedelta(days=day_index)).strftime('%d %B (%A)') if start_date else sheet_name
+        for day_index, sheet_name in enumerate(processed_sheets)
+    ]
 
-        # Use student name for the filename, falling back to student number
-        student_name = student_name_map.get(student, student)
-        sanitized_file_name = sanitize_filename(student_name)
-        camp_part = f"_{camp_name}" if camp_name else ""
-        
-        # Save Excel file
-        xlsx_file_path = os.path.join(output_dir, f'{sanitized_file_name}{camp_part}_timetable.xlsx')
-        student_wb.save(xlsx_file_path)
-        
-        # Save PDF file by converting Excel to PDF
-        pdf_file_path = os.path.join(output_dir, f'{sanitized_file_name}{camp_part}_timetable.pdf')
-        convert_excel_to_pdf(xlsx_file_path, pdf_file_path)
+    # Every student's sheet has the same "Time" header, time column and day headers,
+    # so those cells are laid out once and copied into each student's cells
+    skeleton_cells = {(3, 1): ("Time", BOLD_FONT)}
+    for time, row in time_to_row.items():
+        skeleton_cells[row, 1] = (time, REGULAR_FONT)
+    for day_index, day_header in enumerate(day_headers):
+        skeleton_cells[2, day_index + 2] = (day_header, BOLD_FONT)
+
+    # Output file of each student, named after the student, falling back to student number.
+    # Students sharing a name would overwrite each other's file, so only the last of them
+    # is written; this also keeps the parallel workers writing to distinct files.
+    camp_part = f"_{camp_name}" if camp_name else ""
+    student_files = {}
+    for student in sorted(list(all_students)):
+        sanitized_file_name = sanitize_filename(student_name_map.get(student, student))
+        student_files[os.path.join(output_dir, f'{sanitized_file_name}{camp_part}_timetable')] = student
+
+    # Each student's workbook is independent and building it is CPU-bound, so the
+    # students are written in parallel. The shared data is sent to each worker
+    # process once, through the initializer, rather than with every student.
+    student_context = {
+        'sheet_names': list(processed_sheets),
+        'sheet_days': sheet_days,
+        'shared_schedules': shared_schedules,
+        'group_activities': group_activities,
+        'lowered_activities': lowered_activities,
+        'unmatched_days': unmatched_days,
+        'sorted_times': sorted_times,
+        'time_to_row': time_to_row,
+        'skeleton_cells': skeleton_cells,
+        'music_instrument': music_instrument,
+        'student_name_map': student_name_map,
+        'student_to_groups': student_to_groups,
+        'room_mapping_teachers': room_mapping_teachers,
+        'room_mappings': room_mappings,
+        'room_mappings_by_lower': room_mappings_by_lower,
+        'room_no_map': room_no_map,
+        'room_no_pattern': room_no_pattern,
+        'student_id_list_pattern': student_id_list_pattern,
+    }
+    # Content hashes of the workbooks written by earlier runs, by file name, so
+    # students whose timetable has not changed are not written or converted again
+    hashes_path = os.path.join(output_dir, HASHES_FILENAME)
+    try:
+        with open(hashes_path, 'r', encoding='utf-8') as infile:
+            previous_hashes = json.load(infile)
+    except (FileNotFoundError, ValueError):
+        previous_hashes = {}
+    file_names = [os.path.basename(file_path) for file_path in student_files]
+    with ProcessPoolExecutor(initializer=init_student_worker, initargs=(student_context,)) as executor:
+        content_hashes = list(executor.map(
+            write_student_timetable,
+            student_files.values(),
+            [f'{file_path}.xlsx' for file_path in student_files],
+            [previous_hashes.get(file_name) for file_name in file_names],
+        ))
+
+    # Save PDF files by converting Excel to PDF. Excel is driven through COM one
+    # workbook at a time, so this is done here rather than in the worker processes.
+    for file_path, file_name, content_hash in zip(student_files, file_names, content_hashes):
+        if content_hash == previous_hashes.get(file_name) and os.path.exists(f'{file_path}.pdf'):
+            continue
+        convert_excel_to_pdf(f'{file_path}.xlsx', f'{file_path}.pdf')
+
+    # Hashes are recorded only once the files are written, so an interrupted run
+    # regenerates them next time. Entries of other camps' files are kept.
+    previous_hashes.update(zip(file_names, content_hashes))
+    with open(hashes_path, 'w', encoding='utf-8') as outfile:
+        json.dump(previous_hashes, outfile, indent=2, sort_keys=True)
 
     print(f"Successfully generated timetables (XLSX and PDF) for {len(all_students)} students for {os.path.basename(input_filename)} in the '{output_dir}' directory.")
 
@@ -2,11 +2,121 @@ import re
 import os
 import itertools
 import datetime
-import csv
-from openpyxl import load_workbook, Workbook
+from concurrent.futures import ProcessPoolExecutor
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Alignment, Font, Border, Side
 from openpyxl.utils import get_column_letter
-from shared_utils import sanitize_filename, process_sheet, load_student_name_mapping, load_room_no_mapping
+from openpyxl.worksheet.cell_range import CellRange
+from shared_utils import sanitize_filename, load_processed_sheets, load_student_name_mapping, load_room_no_mapping, compile_replacement_pattern, read_csv_columns
+
+# XlsxWriter is optional and writes faster; openpyxl is used when it is not installed
+try:
+    import xlsxwriter
+    XLSXWRITER_AVAILABLE = True
+except ImportError:
+    XLSXWRITER_AVAILABLE = False
+
+# Shared style objects; openpyxl styles are immutable, so one instance can be assigned to every cell
+THIN_BORDER = Border(
+    left=Side(style='thin'),
+    right=Side(style='thin'),
+    top=Side(style='thin'),
+    bottom=Side(style='thin')
+)
+CENTER_WRAP = Alignment(horizontal='center', vertical='center', wrap_text=True)
+BOLD_FONT = Font(bold=True, size=14)
+REGULAR_FONT = Font(size=14)
+
+# Height of every row of a teacher timetable
+ROW_HEIGHT = 35
+
+# Compiled once at import; the student ID patterns depend on the instrument and are compiled once per instrument
+# Instrument (first part of the file name) and camp of an input file name, parsed in one match
+FILE_META_PATTERN = re.compile(r"^(?P<instrument>[^-]*)-(?:.*?-)??(?P<camp>camp[ab])-", re.IGNORECASE)
+TIMETABLE_FILENAME_PATTERN = re.compile(r"(cello|flute|harp)-(camp[ab])\-time-table\.xlsx", re.IGNORECASE)
+HARP_MASTERCLASS_PATTERN = re.compile(r'harp\s+masterclass\s+by\s+(.+?)(?:\*|$)', re.IGNORECASE)
+TRAILING_ASTERISKS_PATTERN = re.compile(r'\*+$')
+GROUP_RENAME_PATTERN = re.compile(r'(Group\s+\d+)(?! Ensemble Coaching)')
+# (private lesson, student ID) patterns per instrument prefix, filled by get_student_patterns
+STUDENT_PATTERNS = {}
+
+# Day 6 activities shown to teachers as "Lunch": the combined lunch/dress-up slot and the concert call time
+DAY_6_LUNCH_PATTERN = re.compile(r'^(?=.*Lunch)(?=.*Dress Up, Warm Up)|Concert call time', re.DOTALL)
+# Activities (lowercase prefixes) that are left off teacher timetables on days other than Day 6
+SKIPPED_ACTIVITY_PREFIXES = ("workshop", "briefing for saturday")
+
+# Display name and first day of each camp, keyed by the lowercase camp in the file name
+CAMPS = {
+    'campa': ("CampA", datetime.date(2025, 7, 14)),
+    'campb': ("CampB", datetime.date(2025, 7, 21)),
+}
+
+# Time slots of the manually added merge blocks (weekday evenings and Saturday morning)
+EVENING_TIMES = (
+    "19:00", "19:15", "19:30", "19:45",
+    "20:00", "20:15", "20:30", "20:45",
+    "21:00", "21:15", "21:30", "21:45"
+)
+SATURDAY_MORNING_TIMES = ("10:00", "10:15", "10:30", "10:45")
+
+# Teachers with a special event on Friday evening
+SPECIAL_FRIDAY_TEACHERS = frozenset({"Stephane RETY", "Tomasz SKWERES", "Sivan MEGAN", "Liya HUANG", "Gwyneth WENTINK"})
+
+# Schedule rows from this time on are left off teacher timetables
+EVENING_CUTOFF = datetime.time(22, 0)
+# Day 6 rows before this time are covered by the Saturday morning block
+DAY_6_START = datetime.time(11, 0)
+
+# Parsed "HH:MM" labels; the same few labels repeat on every sheet
+TIME_CACHE = {}
+
+def parse_time(time_string):
+    """
+    Parses an "HH:MM" time label into a datetime.time, caching the result per
+    label. Returns None for labels that are not times.
+    """
+    if time_string in TIME_CACHE:
+        return TIME_CACHE[time_string]
+    try:
+        parsed_time = datetime.datetime.strptime(time_string, '%H:%M').time()
+    except ValueError:
+        parsed_time = None
+    TIME_CACHE[time_string] = parsed_time
+    return parsed_time
+
+def styled_cell(worksheet, value=None, font=REGULAR_FONT):
+    """
+    Creates a write-only cell with the shared border, alignment and font.
+    """
+    cell = WriteOnlyCell(worksheet, value=value)
+    cell.border = THIN_BORDER
+    cell.alignment = CENTER_WRAP
+    cell.font = font
+    return cell
+
+def merged_cell(worksheet):
+    """
+    Creates a write-only cell for a position covered by a merged range. It only
+    carries the border, so the merged range is outlined on every side.
+    """
+    cell = WriteOnlyCell(worksheet)
+    cell.border = THIN_BORDER
+    return cell
+
+def get_student_patterns(instrument_prefix):
+    """
+    Returns the compiled private lesson and student ID patterns for an
+    instrument prefix (e.g., "F" for flute), compiling them on first use.
+    """
+    patterns = STUDENT_PATTERNS.get(instrument_prefix)
+    if patterns is None:
+        # Matches "{student_no} Private Lesson with {teacher name} & pianist"
+        private_lesson_pattern = re.compile(rf'\b({instrument_prefix}\d+)\s+Private\s+Lesson\s+with\s+.+?\s+&\s+pianist', re.IGNORECASE)
+        # Student IDs (e.g., F1) in an activity string
+        student_id_pattern = re.compile(rf'\b{instrument_prefix}\d+\b')
+        patterns = STUDENT_PATTERNS[instrument_prefix] = (private_lesson_pattern, student_id_pattern)
+    return patterns
 
 def load_room_mapping(filename):
     """
@@ -16,10 +126,7 @@ def load_room_mapping(filename):
     room_mappings = {}
     try:
         with open(filename, mode='r', encoding='utf-8-sig') as infile:
-            reader = csv.DictReader(infile)
-            for row in reader:
-                teacher_name = row.get('teacher_name')
-                room_number = row.get('room_name')
+            for teacher_name, room_number in read_csv_columns(infile, 'teacher_name', 'room_name'):
                 if teacher_name and room_number:
                     room_mappings[teacher_name.strip()] = room_number.strip()
     except FileNotFoundError:
@@ -29,42 +136,343 @@ def load_room_mapping(filename):
     
     return room_mappings
 
+# Mappings already read from the input CSVs, keyed by (loader, filename), with the
+# file's modification time; several timetable files of one camp share these files
+MAPPING_CACHE = {}
+
+def load_cached_mapping(loader, filename):
+    """
+    Returns loader(filename), reusing the mapping from an earlier call for the
+    same file as long as the file has not been modified since. Missing files
+    are not cached, so the loader reports them every time.
+    """
+    try:
+        modified_time = os.path.getmtime(filename)
+    except OSError:
+        return loader(filename)
+
+    cached = MAPPING_CACHE.get((loader, filename))
+    if cached is not None and cached[0] == modified_time:
+        return cached[1]
+
+    mapping = loader(filename)
+    MAPPING_CACHE[(loader, filename)] = (modified_time, mapping)
+    return mapping
+
+def resolve_activity(activity, private_lesson_pattern, student_id_pattern, student_name_map, room_mappings):
+    """
+    Rewrites an activity cell from a day other than Day 6 into the text shown on
+    teacher timetables: student IDs become names, harp masterclasses get their
+    room and groups are renamed to ensemble coaching. Activities that are left
+    off teacher timetables resolve to an empty string. The two patterns are the
+    compiled, instrument-specific ones from get_student_patterns.
+    """
+    if activity.lower().startswith(SKIPPED_ACTIVITY_PREFIXES):
+        return ""
+
+    if not activity:
+        return activity
+
+    # Handle specific pattern: "{student_no} Private Lesson with {teacher name} & pianist"
+    match = private_lesson_pattern.search(activity)
+    if match:
+        student_id = match.group(1)
+        student_name = student_name_map.get(student_id, student_id)
+        activity = f"{student_name} with pianist"
+    else:
+        # Handle harp MasterClass activities without room numbers
+        if 'harp masterclass' in activity.lower() and 'by' in activity.lower():
+            # Extract teacher name from "Harp MasterClass by Teacher Name"
+            teacher_match = HARP_MASTERCLASS_PATTERN.search(activity)
+            if teacher_match:
+                masterclass_teacher = teacher_match.group(1).strip()
+                # Remove any trailing asterisks or special characters
+                masterclass_teacher = TRAILING_ASTERISKS_PATTERN.sub('', masterclass_teacher).strip()
+
+                # Look up room for this teacher
+                room_number = room_mappings.get(masterclass_teacher, "TBD")
+
+                # Check if room info is already in the activity
+                if '(' not in activity or ')' not in activity:
+                    # Add room information
+                    clean_activity = TRAILING_ASTERISKS_PATTERN.sub('', activity).strip()
+                    activity = f"{clean_activity}\n({room_number})"
+
+        # Rename group activities like "Group 6" to "Group 6 Ensemble Coaching"
+        # (the pattern can only match where "Group" appears, so other cells skip it)
+        if 'Group' in activity:
+            activity = GROUP_RENAME_PATTERN.sub(r'\1 Ensemble Coaching', activity)
+
+        # Replace each student ID (e.g., F1) with their name, if available, in a single pass
+        activity = student_id_pattern.sub(lambda match: student_name_map.get(match.group(0), match.group(0)), activity)
+
+    return activity
+
+def format_activity_lines(activity):
+    """
+    Removes "*" characters from a cell's text and puts the room information and
+    "Ensemble Coaching" on their own lines. Each step is skipped when its marker
+    is absent, so plain activities are returned without building new strings.
+    """
+    if '*' in activity:
+        activity = activity.replace('*', '')
+
+    # Ensure room information is on a new line, but only if it's not already.
+    if '(' in activity and ')' in activity and '\n(' not in activity:
+        activity = activity.replace('(', '\n(', 1)
+
+    # Ensure "Ensemble Coaching" is on a new line
+    if ' Ensemble Coaching' in activity and '\nEnsemble Coaching' not in activity:
+        activity = activity.replace(' Ensemble Coaching', '\nEnsemble Coaching', 1)
+
+    return activity
+
+# Data shared by every teacher of the file being processed, set in each worker process
+TEACHER_CONTEXT = {}
+# Text written to a schedule cell for each activity, filled as the worker's teachers are written
+CELL_TEXT_CACHE = {}
+
+def init_teacher_worker(context):
+    """
+    Stores the data shared by all teachers of a file in a worker process.
+    """
+    TEACHER_CONTEXT.update(context)
+    CELL_TEXT_CACHE.clear()
+
+def get_cell_text(activity):
+    """
+    Returns the text written to a schedule cell for an activity: merge block
+    markers become empty, the lines are formatted and room names are replaced
+    with room numbers. The same activities recur across days and teachers, so
+    the text is built once per activity and cached.
+    """
+    cell_text = CELL_TEXT_CACHE.get(activity)
+    if cell_text is None:
+        cell_text = activity
+        if activity == "EVENING_MERGE_BLOCK" or activity == "SATURDAY_MORNING_MERGE_BLOCK":
+            cell_text = ""
+
+        # Empty cells and merge blocks have nothing to format or replace
+        if cell_text:
+            cell_text = format_activity_lines(cell_text)
+
+            # Replace room names with room numbers
+            room_no_pattern = TEACHER_CONTEXT['room_no_pattern']
+            if room_no_pattern:
+                room_no_map = TEACHER_CONTEXT['room_no_map']
+                cell_text = room_no_pattern.sub(lambda match: room_no_map[match.group(0)], cell_text)
+
+        CELL_TEXT_CACHE[activity] = cell_text
+    return cell_text
+
+def write_teacher_timetable(teacher):
+    """
+    Builds and saves the timetable workbook of a single teacher from the data
+    shared through TEACHER_CONTEXT. Runs in a worker process.
+    """
+    teacher_sheets = TEACHER_CONTEXT['teacher_sheets']
+    ordered_times = TEACHER_CONTEXT['ordered_times']
+    day_headers = TEACHER_CONTEXT['day_headers']
+    camp_name = TEACHER_CONTEXT['camp_name']
+    output_dir = TEACHER_CONTEXT['output_dir']
+
+    all_time_slots = set()
+    # The teacher's {time: activity} schedule of each day they appear on, with the
+    # time slots and activity of the merge block added to that day
+    daily_schedules = {}
+
+    # Only the sheets the teacher appears in are visited
+    for day_index, sheet_name, daily_schedule_map in teacher_sheets.get(teacher, ()):
+        is_day_6 = (day_index + 1) == 6
+
+        if not is_day_6:
+            # For weekdays, manually add the evening merge block
+            is_friday = (day_index == 4)
+            block_times = EVENING_TIMES
+            block_activity = "EVENING_MERGE_BLOCK"
+            if is_friday and teacher in SPECIAL_FRIDAY_TEACHERS:
+                block_activity = "Transfer to Mandarin Oriental"
+        else:
+            # For Saturday, manually add the morning merge block
+            block_times = SATURDAY_MORNING_TIMES
+            block_activity = "SATURDAY_MORNING_MERGE_BLOCK"
+
+        daily_schedules[sheet_name] = (daily_schedule_map, block_times, block_activity)
+        all_time_slots.update(daily_schedule_map)
+        all_time_slots.update(block_times)
+    
+    if not daily_schedules:
+        return
+
+    # The teacher's slots, taken in the precomputed order instead of re-sorting
+    sorted_times = [time for time in ordered_times if time in all_time_slots]
+    # Row offset of each time slot, so a day's activities can be placed in a list by index
+    time_indexes = {time: index for index, time in enumerate(sorted_times)}
+
+    # Days the teacher appears on, in order; each gets a column from column 2
+    teacher_days = [(day_index, sheet_name) for day_index, sheet_name, _ in teacher_sheets[teacher]]
+    column_count = len(teacher_days) + 1
+    row_count = len(sorted_times) + 3
+
+    # The sheet is laid out as a grid (rows, then columns) of (value, is_bold) cells
+    # and written by save_teacher_workbook. Cells covered by a merged range are None.
+    grid = [[None] * column_count for _ in range(row_count)]
+    # Merged ranges as 1-based (min_row, min_col, max_row, max_col)
+    merges = []
+
+    # Add teacher name in row 1, merged across all columns
+    grid[0][0] = (teacher, True)
+    merges.append((1, 1, 1, column_count))
+
+    grid[1][0] = (None, False)
+    grid[2][0] = ("Time", True)
+    for i, time in enumerate(sorted_times):
+        grid[i + 3][0] = (time, False)
+
+    for column_index, (day_index, sheet_name) in enumerate(teacher_days, start=1):
+        grid[1][column_index] = (day_headers[day_index], True)
+        grid[2][column_index] = (None, False)
+        
+        # Create a full schedule for the day, including empty slots, to allow merging of consecutive empty cells.
+        # It is a list with one activity per slot in sorted_times, so no per-day sorting is needed.
+        daily_schedule_map, block_times, block_activity = daily_schedules[sheet_name]
+        full_day_schedule = [""] * len(sorted_times)
+        for time, activity in daily_schedule_map.items():
+            full_day_schedule[time_indexes[time]] = activity
+        for time in block_times:
+            full_day_schedule[time_indexes[time]] = block_activity
+
+        # Time slots map to consecutive rows from row 4, so each group starts where the previous one ended
+        start_row = 4
+        for activity, group in itertools.groupby(full_day_schedule):
+            # Only the number of slots in the group is needed, so count them without building a list
+            row_span = sum(1 for _ in group)
+            
+            grid[start_row - 1][column_index] = (get_cell_text(activity), False)
+
+            if row_span > 1:
+                merges.append((start_row, column_index + 1, start_row + row_span - 1, column_index + 1))
+
+            start_row += row_span
+
+    # Set column widths: Time column auto-fit, date columns set to 80.
+    # The Time column only holds the teacher name, "Time" and the time slots,
+    # so it is fitted from those values rather than by scanning its cells.
+    max_length = max(len(line) for value in (teacher, "Time", *sorted_times) for line in value.split('\n'))
+
+    # Set reasonable width for time column
+    font_size_factor = 1.3
+    padding = 2
+    if max_length > 0:
+        adjusted_width = max(max_length * font_size_factor + padding, 15)
+        adjusted_width = min(adjusted_width, 25)  # Reasonable max for time column
+    else:
+        adjusted_width = 15
+
+    # Date columns (Monday to Saturday)
+    column_widths = [adjusted_width] + [80] * len(teacher_days)
+
+    sanitized_file_name = sanitize_filename(teacher)
+    camp_part = f"_{camp_name}" if camp_name else ""
+    file_path = os.path.join(output_dir, f'{sanitized_file_name}{camp_part}_timetable.xlsx')
+    save_teacher_workbook(file_path, grid, merges, column_widths)
+
+def save_teacher_workbook(file_path, grid, merges, column_widths):
+    """
+    Saves a teacher timetable laid out by write_teacher_timetable: a grid of
+    (value, is_bold) cells with None for cells covered by a merged range, the
+    1-based (min_row, min_col, max_row, max_col) merged ranges and the column
+    widths. Every cell gets the shared border, alignment and font, and every
+    row the same height. Uses XlsxWriter when it is installed and openpyxl in
+    write-only mode otherwise.
+    """
+    if XLSXWRITER_AVAILABLE:
+        workbook = xlsxwriter.Workbook(file_path)
+        worksheet = workbook.add_worksheet("Full Timetable")
+        cell_formats = {
+            is_bold: workbook.add_format({
+                'bold': is_bold, 'font_size': 14, 'border': 1,
+                'align': 'center', 'valign': 'vcenter', 'text_wrap': True
+            })
+            for is_bold in (False, True)
+        }
+        # set_column adds Excel's cell padding to the width, while openpyxl stores it as given.
+        # Setting the width in pixels (7 per character of the default font) stores the same width.
+        for column_index, width in enumerate(column_widths):
+            worksheet.set_column_pixels(column_index, column_index, round(width * 7))
+
+        # merge_range writes the value and styles the covered cells in one call
+        merge_ends = {(min_row - 1, min_col - 1): (max_row - 1, max_col - 1) for min_row, min_col, max_row, max_col in merges}
+        for row_index, row in enumerate(grid):
+            worksheet.set_row(row_index, ROW_HEIGHT)
+            for column_index, cell in enumerate(row):
+                if cell is None:
+                    continue
+                value, is_bold = cell
+                cell_format = cell_formats[is_bold]
+                merge_end = merge_ends.get((row_index, column_index))
+                if merge_end:
+                    worksheet.merge_range(row_index, column_index, *merge_end, value or "", cell_format)
+                elif value:
+                    worksheet.write_string(row_index, column_index, value, cell_format)
+                else:
+                    worksheet.write_blank(row_index, column_index, None, cell_format)
+        workbook.close()
+        return
+
+    # In write-only mode column widths and row heights must be set before the first
+    # row is written, and rows are written in order
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet("Full Timetable")
+    for column_number, width in enumerate(column_widths, start=1):
+        worksheet.column_dimensions[get_column_letter(column_number)].width = width
+    for row_number in range(1, len(grid) + 1):
+        worksheet.row_dimensions[row_number].height = ROW_HEIGHT
+    for min_row, min_col, max_row, max_col in merges:
+        worksheet.merged_cells.add(CellRange(min_col=min_col, min_row=min_row, max_col=max_col, max_row=max_row))
+
+    for row in grid:
+        worksheet.append([
+            merged_cell(worksheet) if cell is None else styled_cell(worksheet, cell[0], BOLD_FONT if cell[1] else REGULAR_FONT)
+            for cell in row
+        ])
+    workbook.save(file_path)
+
 def generate_teacher_timetables(input_filename):
     """
     Reads an Excel file with multiple sheets (each representing a date) and
     generates an individual Excel timetable for each teacher.
     """
     basename = os.path.basename(input_filename)
-    music_instrument = basename.split('-')[0].capitalize()
 
-    # Extract camp (e.g., "campA") from filename
-    camp_match = re.search(r"-(camp[ab])\-", basename, re.IGNORECASE)
-    if not camp_match:
+    # Extract instrument and camp (e.g., "campA") from filename
+    file_match = FILE_META_PATTERN.match(basename)
+    if not file_match:
         print(f"Warning: Could not determine camp from filename {basename}. Cannot load mappings.")
         return
     
-    camp_part = camp_match.group(1) # e.g., 'campA' - preserve original case
+    music_instrument = file_match.group('instrument').capitalize()
+    camp_part = file_match.group('camp') # e.g., 'campA' - preserve original case
+    # Start date and camp name, from the camp in the file name
+    camp_name, start_date = CAMPS[camp_part.lower()]
 
     try:
-        workbook = load_workbook(input_filename, data_only=True)
+        # Sheet data with merged cells filled in, keyed by sheet name in workbook order
+        processed_sheets = load_processed_sheets(input_filename)
         print(f"\nProcessing teacher timetables for {basename}...")
     except FileNotFoundError:
         print(f"Error: {input_filename} not found.")
         return
 
     student_mapping_file = os.path.join("input", f"student_mapping-{camp_part}.csv")
-    student_name_map = load_student_name_mapping(student_mapping_file)
+    student_name_map = load_cached_mapping(load_student_name_mapping, student_mapping_file)
 
     room_mapping_file = os.path.join("input", f"room_mapping-{camp_part}.csv")
-    room_mappings = load_room_mapping(room_mapping_file)
+    room_mappings = load_cached_mapping(load_room_mapping, room_mapping_file)
 
     room_no_mapping_file = os.path.join("input", f"room_no_mapping-{camp_part}.csv")
-    room_no_map = load_room_no_mapping(room_no_mapping_file)
-
-    processed_sheets = {}
-    for sheet_name in workbook.sheetnames:
-        sheet = workbook[sheet_name]
-        processed_sheets[sheet_name] = process_sheet(sheet)
+    room_no_map = load_cached_mapping(load_room_no_mapping, room_no_mapping_file)
+    room_no_pattern = compile_replacement_pattern(room_no_map)
 
     all_teachers = set()
     for sheet_name, sheet_data in processed_sheets.items():
@@ -72,287 +480,120 @@ def generate_teacher_timetables(input_filename):
             # Teacher names are in the first row, starting from the second column
             teacher_row = sheet_data[0]
             for teacher_name in teacher_row[1:]:
-                if teacher_name and isinstance(teacher_name, str) and teacher_name.strip():
-                    all_teachers.add(teacher_name.strip())
+                if isinstance(teacher_name, str) and teacher_name:
+                    all_teachers.add(teacher_name)
 
     output_dir = "teacher_timetables"
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    # Define border style
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-
-    # Determine start date and camp name based on filename
-    start_date = None
-    camp_name = ""
-    if 'campa' in input_filename.lower():
-        start_date = datetime.date(2025, 7, 14)
-        camp_name = "CampA"
-    elif 'campb' in input_filename.lower():
-        start_date = datetime.date(2025, 7, 21)
-        camp_name = "CampB"
-
-    # Teachers with a special event on Friday evening
-    special_friday_teachers = ["Stephane RETY", "Tomasz SKWERES", "Sivan MEGAN", "Liya HUANG", "Gwyneth WENTINK"]
-
-    for teacher in sorted(list(all_teachers)):
-        all_time_slots = set()
-        daily_schedules = {}
-
-        for day_index, sheet_name in enumerate(workbook.sheetnames):
-            if sheet_name not in processed_sheets:
+    # Time labels of each schedule row, per sheet. These do not depend on the teacher,
+    # so they are computed once and sorted once into the canonical order of all slots.
+    sheet_times = {}
+    for sheet_name, sheet_data in processed_sheets.items():
+        sheet_times[sheet_name] = [
+            row[0].strftime('%H:%M') if isinstance(row[0], datetime.time) else str(row[0])
+            for row in sheet_data[2:]
+        ]
+    all_sheet_times = set(EVENING_TIMES) | set(SATURDAY_MORNING_TIMES)
+    for times in sheet_times.values():
+        all_sheet_times.update(times)
+    ordered_times = sorted(all_sheet_times)
+
+    # Header text of each day's column, the same for every teacher
+    day_headers = [
+        (start_date + datetime.timedelta(days=day_index)).strftime('%d %B (%A)') if start_date else sheet_name
+        for day_index, sheet_name in enumerate(processed_sheets)
+    ]
+
+    # Activity text of each schedule cell as shown on teacher timetables. The rewrite
+    # only depends on the cell, so it is done once per sheet rather than per teacher.
+    private_lesson_pattern, student_id_pattern = get_student_patterns(music_instrument[0].upper())
+    # Resolved text of each distinct activity on days other than Day 6. The same
+    # activities recur across rows and days, so each is only resolved once.
+    # Empty cells resolve to themselves.
+    resolved_activities = {"": ""}
+    resolved_sheets = {}
+    for day_index, sheet_name in enumerate(processed_sheets):
+        is_day_6 = (day_index + 1) == 6
+        resolved_rows = []
+        for row in processed_sheets[sheet_name][2:]:
+            # Cells are already stripped strings ("" when empty) or other values; only the latter need str()
+            values = [value if isinstance(value, str) else str(value) for value in row]
+            if is_day_6:
+                resolved_rows.append(["Lunch" if value and DAY_6_LUNCH_PATTERN.search(value) else value for value in values])
+            else:
+                resolved_row = []
+                for value in values:
+                    resolved = resolved_activities.get(value)
+                    if resolved is None:
+                        resolved = resolve_activity(value, private_lesson_pattern, student_id_pattern, student_name_map, room_mappings)
+                        resolved_activities[value] = resolved
+                    resolved_row.append(resolved)
+                resolved_rows.append(resolved_row)
+        resolved_sheets[sheet_name] = resolved_rows
+
+    # The (day_index, sheet_name, {time: activity} schedule) of each sheet a teacher
+    # appears in, in sheet order, built in a single pass over the sheets instead of
+    # re-scanning every sheet for every teacher
+    teacher_sheets = {}
+    for day_index, sheet_name in enumerate(processed_sheets):
+        is_day_6 = (day_index + 1) == 6
+        # Column index of each header name (its first occurrence), looked up once per teacher
+        header_columns = {}
+        for col_index, name in enumerate(str(h) for h in processed_sheets[sheet_name][0]):
+            header_columns.setdefault(name, col_index)
+
+        teacher_columns = {}
+        for teacher in all_teachers:
+            if teacher in header_columns:
+                teacher_columns[teacher] = header_columns[teacher]
+            elif is_day_6:
+                teacher_columns[teacher] = 1  # Assume the second column for Day 6 activities
+
+        # Rows shown on teacher timetables, with their time labels, filtered once per sheet
+        kept_rows = []
+        for row, time in zip(resolved_sheets[sheet_name], sheet_times[sheet_name]):
+            if not time:
                 continue
-            
-            is_day_6 = (day_index + 1) == 6
-            sheet_data = processed_sheets[sheet_name]
-            header = [str(h).strip() for h in sheet_data[0]]
-            
-            try:
-                # Find the column index for the current teacher
-                teacher_col_index = header.index(teacher)
-            except ValueError:
-                if is_day_6:
-                    teacher_col_index = 1  # Assume the second column for Day 6 activities
-                else:
-                    # Teacher not present in this sheet
-                    continue
 
-            schedule_rows = sheet_data[2:]
-            daily_schedule_map = {}
-            
-            for row in schedule_rows:
-                time_val = row[0]
-                time = time_val.strftime('%H:%M') if isinstance(time_val, datetime.time) else str(time_val).strip()
-                
-                if not time:
+            current_time_obj = parse_time(time)
+            if current_time_obj is not None:
+                if current_time_obj >= EVENING_CUTOFF:
                     continue
 
-                current_time_obj = None
-                try:
-                    current_time_obj = datetime.datetime.strptime(time, '%H:%M').time()
-                    if current_time_obj >= datetime.time(22, 0):
-                        continue
-
-                    if is_day_6 and current_time_obj < datetime.time(11, 0):
-                        continue
-                except ValueError:
-                    pass
-
-                # Get the activity from the teacher's column
-                activity = str(row[teacher_col_index]).strip() if len(row) > teacher_col_index else ""
-                
-                if is_day_6:
-                    if "Lunch" in activity and "Dress Up, Warm Up" in activity:
-                        activity = "Lunch"
-                    elif "Concert call time" in activity:
-                        activity = "Lunch"
-                else: # Special processing only for days other than Day 6
-                    if activity.lower().startswith("workshop") or activity.lower().startswith("briefing for saturday"):
-                        activity = ""
-
-                    if activity:
-                        # Handle specific pattern: "{student_no} Private Lesson with {teacher name} & pianist"
-                        instrument_prefix = music_instrument[0].upper()
-                        private_lesson_pattern = rf'\b({instrument_prefix}\d+)\s+Private\s+Lesson\s+with\s+.+?\s+&\s+pianist'
-                        match = re.search(private_lesson_pattern, activity, re.IGNORECASE)
-                        if match:
-                            student_id = match.group(1)
-                            student_name = student_name_map.get(student_id, student_id)
-                            activity = f"{student_name} with pianist"
-                        else:
-                            # Handle harp MasterClass activities without room numbers
-                            if 'harp masterclass' in activity.lower() and 'by' in activity.lower():
-                                # Extract teacher name from "Harp MasterClass by Teacher Name"
-                                teacher_match = re.search(r'harp\s+masterclass\s+by\s+(.+?)(?:\*|$)', activity, re.IGNORECASE)
-                                if teacher_match:
-                                    masterclass_teacher = teacher_match.group(1).strip()
-                                    # Remove any trailing asterisks or special characters
-                                    masterclass_teacher = re.sub(r'\*+$', '', masterclass_teacher).strip()
-                                    
-                                    # Look up room for this teacher
-                                    room_number = room_mappings.get(masterclass_teacher, "TBD")
-                                    
-                                    # Check if room info is already in the activity
-                                    if '(' not in activity or ')' not in activity:
-                                        # Add room information
-                                        clean_activity = re.sub(r'\*+$', '', activity).strip()
-                                        activity = f"{clean_activity}\n({room_number})"
-                            
-                            # Rename group activities like "Group 6" to "Group 6 Ensemble Coaching"
-                            activity = re.sub(r'(Group\s+\d+)(?! Ensemble Coaching)', r'\1 Ensemble Coaching', activity)
-
-                            # Find all student IDs (e.g., F1) in the activity string
-                            student_ids = re.findall(rf'\b{instrument_prefix}\d+\b', activity)
-                            
-                            for student_id in student_ids:
-                                # Replace each student ID with their name, if available
-                                student_name = student_name_map.get(student_id, student_id)
-                                activity = activity.replace(student_id, student_name)
-                
-                if activity:
-                    daily_schedule_map[time] = activity
-
-            # For weekdays, manually add the evening merge block
-            if not is_day_6:
-                is_friday = (day_index == 4)
-                evening_times = [
-                    "19:00", "19:15", "19:30", "19:45",
-                    "20:00", "20:15", "20:30", "20:45",
-                    "21:00", "21:15", "21:30", "21:45"
-                ]
-                
-                evening_activity = "EVENING_MERGE_BLOCK"
-                if is_friday and teacher in special_friday_teachers:
-                    evening_activity = "Transfer to Mandarin Oriental"
-
-                for evening_time in evening_times:
-                    daily_schedule_map[evening_time] = evening_activity
-
-            # For Saturday, manually add the morning merge block
-            if is_day_6:
-                morning_times = ["10:00", "10:15", "10:30", "10:45"]
-                for morning_time in morning_times:
-                    daily_schedule_map[morning_time] = "SATURDAY_MORNING_MERGE_BLOCK"
-
-            # Sort the schedule by time to ensure correct grouping for merging
-            teacher_schedule = sorted(daily_schedule_map.items())
-
-            daily_schedules[sheet_name] = teacher_schedule
-            for time, _ in teacher_schedule:
-                all_time_slots.add(time)
-        
-        if not daily_schedules:
-            continue
-
-        sorted_times = sorted(list(all_time_slots))
-        time_to_row = {time: i + 4 for i, time in enumerate(sorted_times)}
-
-        teacher_wb = Workbook()
-        teacher_ws = teacher_wb.active
-        teacher_ws.title = "Full Timetable"
-
-        # Add teacher name in row 1, merged across all columns
-        teacher_ws.cell(row=1, column=1, value=teacher).font = Font(bold=True, size=14)
-        
-        teacher_ws.cell(row=3, column=1, value="Time").font = Font(bold=True, size=14)
-        for i, time in enumerate(sorted_times):
-            teacher_ws.cell(row=i + 4, column=1, value=time).font = Font(size=14)
-
-        current_col = 2
-        for day_index, sheet_name in enumerate(workbook.sheetnames):
-            if sheet_name not in daily_schedules:
-                continue
-            
-            if start_date:
-                current_date = start_date + datetime.timedelta(days=day_index)
-                header_text = current_date.strftime('%d %B (%A)')
-            else:
-                header_text = sheet_name
-
-            teacher_ws.cell(row=2, column=current_col, value=header_text).font = Font(bold=True, size=14)
-            
-            # Create a full schedule for the day, including empty slots, to allow merging of consecutive empty cells.
-            todays_schedule_map = dict(daily_schedules[sheet_name])
-            full_day_schedule = [(time, todays_schedule_map.get(time, "")) for time in sorted_times]
-
-            for activity, group in itertools.groupby(full_day_schedule, key=lambda x: x[1]):
-                group_list = list(group)
-                row_span = len(group_list)
-                start_time = group_list[0][0]
-                
-                if start_time not in time_to_row: continue
-
-                start_row = time_to_row[start_time]
-                
-                cell_activity = activity
-                if activity == "EVENING_MERGE_BLOCK" or activity == "SATURDAY_MORNING_MERGE_BLOCK":
-                    cell_activity = ""
-
-                # Remove any "*" characters from the cell content
-                cell_activity = cell_activity.replace('*', '')
-
-                # Ensure room information is on a new line, but only if it's not already.
-                if '(' in cell_activity and ')' in cell_activity and '\n(' not in cell_activity:
-                    cell_activity = cell_activity.replace('(', '\n(', 1)
-
-                # Ensure "Ensemble Coaching" is on a new line
-                if 'Ensemble Coaching' in cell_activity and '\nEnsemble Coaching' not in cell_activity:
-                    cell_activity = cell_activity.replace(' Ensemble Coaching', '\nEnsemble Coaching', 1)
-
-                # Replace room names with room numbers
-                if room_no_map:
-                    for r_name, r_number in room_no_map.items():
-                        cell_activity = cell_activity.replace(r_name, r_number)
-
-                if row_span > 1:
-                    end_row = start_row + row_span - 1
-                    teacher_ws.merge_cells(start_row=start_row, start_column=current_col, end_row=end_row, end_column=current_col)
-
-                # Set value on the top-left cell of the (merged) range
-                cell = teacher_ws.cell(row=start_row, column=current_col, value=cell_activity)
-
-            current_col += 1
-
-        # Merge teacher name across all columns in row 1
-        teacher_ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=current_col-1)
-
-        # Set column widths: Time column auto-fit, date columns set to 80
-        for column in teacher_ws.columns:
-            column_letter = get_column_letter(column[0].column)
-            column_number = column[0].column
-            
-            if column_number == 1:  # Time column
-                # Auto-fit time column based on content
-                max_length = 0
-                for cell in column:
-                    try:
-                        if cell.value:
-                            lines = str(cell.value).split('\n')
-                            max_line_length = max(len(line) for line in lines) if lines else 0
-                            if max_line_length > max_length:
-                                max_length = max_line_length
-                    except:
-                        pass
-                
-                # Set reasonable width for time column
-                font_size_factor = 1.3
-                padding = 2
-                if max_length > 0:
-                    adjusted_width = max(max_length * font_size_factor + padding, 15)
-                    adjusted_width = min(adjusted_width, 25)  # Reasonable max for time column
-                else:
-                    adjusted_width = 15
-                teacher_ws.column_dimensions[column_letter].width = adjusted_width
-            else:  # Date columns (Monday to Saturday)
-                # Set date columns to width 80
-                teacher_ws.column_dimensions[column_letter].width = 80
-
-        # Set specific row heights as requested
-        teacher_ws.row_dimensions[1].height = 35  # Teacher name header
-        teacher_ws.row_dimensions[2].height = 35  # Date headers
-        for row_index in range(3, teacher_ws.max_row + 1):
-            teacher_ws.row_dimensions[row_index].height = 35  # Time and data rows
-
-        # Apply borders, alignment, and font to all cells
-        for row in teacher_ws.iter_rows(min_row=1, max_row=teacher_ws.max_row, min_col=1, max_col=teacher_ws.max_column):
-            for cell in row:
-                cell.border = thin_border
-                cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-                # Apply 14pt font to all cells, preserving existing bold formatting if any
-                if cell.font and cell.font.bold:
-                    cell.font = Font(bold=True, size=14)
-                else:
-                    cell.font = Font(size=14)
+                if is_day_6 and current_time_obj < DAY_6_START:
+                    continue
 
-        sanitized_file_name = sanitize_filename(teacher)
-        camp_part = f"_{camp_name}" if camp_name else ""
-        file_path = os.path.join(output_dir, f'{sanitized_file_name}{camp_part}_timetable.xlsx')
-        teacher_wb.save(file_path)
+            kept_rows.append((time, row))
+
+        # The {time: activity} schedule of each column in use. Columns are walked once
+        # even when several teachers share one (Day 6), and teachers whose column is
+        # empty get an empty schedule. The schedules are only read afterwards.
+        column_schedules = {}
+        for teacher_col_index in set(teacher_columns.values()):
+            column_schedules[teacher_col_index] = {
+                time: row[teacher_col_index]
+                for time, row in kept_rows
+                if len(row) > teacher_col_index and row[teacher_col_index]
+            }
+        for teacher, teacher_col_index in teacher_columns.items():
+            teacher_sheets.setdefault(teacher, []).append((day_index, sheet_name, column_schedules[teacher_col_index]))
+
+    # Each teacher's workbook is independent and writing it is CPU-bound, so the
+    # teachers are written in parallel. The shared data is sent to each worker
+    # process once, through the initializer, rather than with every teacher.
+    teacher_context = {
+        'teacher_sheets': teacher_sheets,
+        'ordered_times': ordered_times,
+        'day_headers': day_headers,
+        'camp_name': camp_name,
+        'room_no_map': room_no_map,
+        'room_no_pattern': room_no_pattern,
+        'output_dir': output_dir,
+    }
+    with ProcessPoolExecutor(initializer=init_teacher_worker, initargs=(teacher_context,)) as executor:
+        list(executor.map(write_teacher_timetable, sorted(all_teachers)))
 
     print(f"Successfully generated timetables for {len(all_teachers)} teachers for {os.path.basename(input_filename)} in the '{output_dir}' directory.")
 
@@ -361,10 +602,7 @@ if __name__ == '__main__':
     if not os.path.isdir(input_dir):
         print(f"Error: Input directory '{input_dir}' not found or is not a directory.")
     else:
-        # Regex to match the expected filename format for specific instruments
-        filename_pattern = re.compile(r"(cello|flute|harp)-(camp[ab])\-time-table\.xlsx", re.IGNORECASE)
-        
-        timetable_files = [f for f in os.listdir(input_dir) if filename_pattern.match(f)]
+        timetable_files = [f for f in os.listdir(input_dir) if TIMETABLE_FILENAME_PATTERN.match(f)]
 
         if not timetable_files:
             print(f"No timetable files matching the pattern '{{music-instrument}}-{{campA or campB}}-time-table.xlsx' were found in '{input_dir}'.")
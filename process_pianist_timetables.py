@@ -1,12 +1,57 @@
 import os
 import re
-import csv
+import bisect
 import datetime
 import itertools
+import logging
+from concurrent.futures import ProcessPoolExecutor
 from openpyxl import load_workbook, Workbook
-from openpyxl.styles import Alignment, Font, Border, Side
+from openpyxl.styles import Alignment, Font, Border, Side, NamedStyle
 from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.dimensions import RowDimension
+from openpyxl.cell.read_only import EMPTY_CELL
 from copy import copy
+from shared_utils import compile_replacement_pattern, get_merged_ranges, read_csv_columns
+
+# Debug output goes through logging, so its messages are only formatted when DEBUG is enabled
+logger = logging.getLogger(__name__)
+
+# Shared style objects; openpyxl styles are immutable, so one instance can be assigned to every cell
+THIN_BORDER = Border(
+    left=Side(style='thin'),
+    right=Side(style='thin'),
+    top=Side(style='thin'),
+    bottom=Side(style='thin')
+)
+CENTER_WRAP = Alignment(horizontal='center', vertical='center', wrap_text=True)
+BOLD_FONT = Font(bold=True, size=20)
+REGULAR_FONT = Font(size=20)
+# Named styles combining the border, alignment and each font, registered on every pianist workbook
+CELL_STYLE = 'Pianist Cell'
+BOLD_CELL_STYLE = 'Pianist Bold Cell'
+
+# Compiled once at import
+# Time formats accepted in the time column: HH:MM or H:MM, HH.MM or H.MM, and HHMM
+TIME_PATTERNS = [
+    re.compile(r'(\d{1,2}):(\d{2})'),
+    re.compile(r'(\d{1,2})\.(\d{2})'),
+    re.compile(r'(\d{1,2})(\d{2})'),
+]
+STUDENT_ID_PATTERN = re.compile(r'\b[FCH]\d+\b')
+# Name of a pianist sheet: "{pianist name}-campA" or "{pianist name}-campB"
+PIANIST_SHEET_PATTERN = re.compile(r"-(camp[ab])$", re.IGNORECASE)
+
+# Evening time slots (19:00-22:00) merged in each weekday column, as normalized by process_sheet_data
+EVENING_TIMES = ("19:00", "20:00", "21:00", "22:00")
+
+# Display name and first day of each camp, keyed by the lowercase camp in the sheet name
+CAMPS = {
+    'campa': ("CampA", datetime.date(2025, 7, 14)),
+    'campb': ("CampB", datetime.date(2025, 7, 21)),
+}
+
+# Cell text treated as empty when merging empty cells, after stripping and lowercasing
+EMPTY_TEXTS = frozenset({"", "none"})
 
 def load_student_name_mapping(filename):
     """
@@ -14,27 +59,19 @@ def load_student_name_mapping(filename):
     The CSV should have 'student_no' and 'student_name' columns.
     """
     student_mappings = {}
-    print(f"DEBUG - Loading student mapping from: {filename}")
+    logger.debug("Loading student mapping from: %s", filename)
     try:
         with open(filename, mode='r', encoding='utf-8-sig') as infile:
-            reader = csv.DictReader(infile)
-            print(f"DEBUG - CSV headers: {reader.fieldnames}")
-            
-            for row_num, row in enumerate(reader):
-                student_no = row.get('student_no')
-                student_name = row.get('student_name')
-                print(f"DEBUG - Row {row_num + 1}: student_no='{student_no}', student_name='{student_name}'")
-                
+            for student_no, student_name in read_csv_columns(infile, 'student_no', 'student_name'):
                 if student_no and student_name:
                     student_mappings[student_no.strip()] = student_name.strip()
-                    print(f"DEBUG - Added student mapping: '{student_no.strip()}' -> '{student_name.strip()}'")
                         
     except FileNotFoundError:
         print(f"Warning: Student mapping file '{filename}' not found.")
     except Exception as e:
         print(f"An error occurred while reading {filename}: {e}")
     
-    print(f"DEBUG - Final student mappings loaded: {len(student_mappings)} entries")
+    logger.debug("Final student mappings loaded: %s entries", len(student_mappings))
     return student_mappings
 
 def load_room_no_mapping(filename):
@@ -43,27 +80,19 @@ def load_room_no_mapping(filename):
     The CSV should have 'room_name' and 'room_number' columns.
     """
     room_mappings = {}
-    print(f"DEBUG - Loading room mapping from: {filename}")
+    logger.debug("Loading room mapping from: %s", filename)
     try:
         with open(filename, mode='r', encoding='utf-8-sig') as infile:
-            reader = csv.DictReader(infile)
-            print(f"DEBUG - CSV headers: {reader.fieldnames}")
-            
-            for row_num, row in enumerate(reader):
-                room_name = row.get('room_name')
-                room_number = row.get('room_number')
-                print(f"DEBUG - Row {row_num + 1}: room_name='{room_name}', room_number='{room_number}'")
-                
+            for room_name, room_number in read_csv_columns(infile, 'room_name', 'room_number'):
                 if room_name and room_number:
                     room_mappings[room_name.strip()] = room_number.strip()
-                    print(f"DEBUG - Added room mapping: '{room_name.strip()}' -> '{room_number.strip()}'")
                         
     except FileNotFoundError:
         print(f"Warning: Room mapping file '{filename}' not found.")
     except Exception as e:
         print(f"An error occurred while reading {filename}: {e}")
     
-    print(f"DEBUG - Final room mappings loaded: {len(room_mappings)} entries")
+    logger.debug("Final room mappings loaded: %s entries", len(room_mappings))
     return room_mappings
 
 def sanitize_filename(filename):
@@ -76,25 +105,47 @@ def sanitize_filename(filename):
         filename = filename.replace(char, '_')
     return filename
 
-def process_sheet_data(sheet, student_map, room_no_map):
+def read_sheet_values(sheet):
+    """
+    Reads a read-only worksheet into a list of rows of values, together with the
+    (min_col, min_row, max_col, max_row) bounds of its merged ranges. The rows
+    are the same as a fully loaded worksheet gives: they span the cells present
+    in the sheet and its merged ranges, and the cells a merge covers other than
+    its top-left one are empty.
+    """
+    # The sheet's stored dimensions can include empty rows, so they are recomputed from its cells
+    sheet.reset_dimensions()
+    merged_ranges = get_merged_ranges(sheet)
+    
+    values = {}
+    for row in sheet.iter_rows():
+        for cell in row:
+            if cell is not EMPTY_CELL:
+                values[cell.row, cell.column] = cell.value
+    for min_col, min_row, max_col, max_row in merged_ranges:
+        for row_num in range(min_row, max_row + 1):
+            for col_num in range(min_col, max_col + 1):
+                if (row_num, col_num) != (min_row, min_col):
+                    values[row_num, col_num] = None
+    
+    max_row = max((row_num for row_num, _ in values), default=0)
+    max_col = max((col_num for _, col_num in values), default=0)
+    rows = [[values.get((row_num, col_num)) for col_num in range(1, max_col + 1)] for row_num in range(1, max_row + 1)]
+    return rows, merged_ranges
+
+def process_sheet_data(sheet_rows, student_map, room_no_map, room_no_pattern):
     """
-    Process sheet data into a structured format with proper time formatting.
+    Process sheet data, as read by read_sheet_values, into a structured format with proper time formatting.
+    room_no_pattern is room_no_map compiled with compile_replacement_pattern.
     Returns: List of rows where each row is [time, col1_activity, col2_activity, ...]
     """
     processed_data = []
     
-    # Get all data from the sheet
-    max_row = sheet.max_row
-    max_col = sheet.max_column
-    
     # Process each row
-    for row_num in range(1, max_row + 1):
+    for row_values in sheet_rows:
         row_data = []
         
-        for col_num in range(1, max_col + 1):
-            cell = sheet.cell(row=row_num, column=col_num)
-            value = cell.value
-            
+        for col_num, value in enumerate(row_values, start=1):
             # Handle time formatting for first column (assuming it's time)
             if col_num == 1 and value:
                 if isinstance(value, datetime.time):
@@ -105,17 +156,11 @@ def process_sheet_data(sheet, student_map, room_no_map):
                     # Try to parse and reformat time strings
                     try:
                         # Handle various time formats
-                        time_patterns = [
-                            r'(\d{1,2}):(\d{2})',  # HH:MM or H:MM
-                            r'(\d{1,2})\.(\d{2})',  # HH.MM or H.MM
-                            r'(\d{1,2})(\d{2})',    # HHMM
-                        ]
-                        
                         time_str = str(value).strip()
                         parsed_time = None
                         
-                        for pattern in time_patterns:
-                            match = re.search(pattern, time_str)
+                        for pattern in TIME_PATTERNS:
+                            match = pattern.search(time_str)
                             if match:
                                 hours = int(match.group(1))
                                 minutes = int(match.group(2))
@@ -134,17 +179,12 @@ def process_sheet_data(sheet, student_map, room_no_map):
             if value and isinstance(value, str):
                 updated_value = value
                 
-                # Replace student IDs with student names
-                student_ids_found = re.findall(r'\b[FCH]\d+\b', updated_value)
-                for student_id in set(student_ids_found):
-                    student_name = student_map.get(student_id, student_id)
-                    if student_name != student_id:
-                        updated_value = re.sub(r'\b' + re.escape(student_id) + r'\b', student_name, updated_value)
+                # Replace student IDs with student names, in a single pass; unmapped IDs are kept
+                updated_value = STUDENT_ID_PATTERN.sub(lambda match: student_map.get(match.group(0), match.group(0)), updated_value)
                 
-                # Replace room names with room numbers
-                for room_name, room_number in room_no_map.items():
-                    if room_name in updated_value:
-                        updated_value = updated_value.replace(room_name, room_number)
+                # Replace room names with room numbers, in a single pass
+                if room_no_pattern:
+                    updated_value = room_no_pattern.sub(lambda match: room_no_map[match.group(0)], updated_value)
                 
                 value = updated_value
             
@@ -154,78 +194,114 @@ def process_sheet_data(sheet, student_map, room_no_map):
     
     return processed_data
 
-def apply_cell_merging(pianist_ws, original_sheet):
+def build_merge_index(pianist_ws):
+    """
+    Returns the rows covered by the worksheet's merged ranges, as a dict from
+    column number to a sorted list of (min_row, max_row) intervals. Merged
+    ranges never overlap, so the intervals of a column are disjoint.
+    """
+    merge_index = {}
+    for merged_range in pianist_ws.merged_cells.ranges:
+        for col_num in range(merged_range.min_col, merged_range.max_col + 1):
+            merge_index.setdefault(col_num, []).append((merged_range.min_row, merged_range.max_row))
+    for intervals in merge_index.values():
+        intervals.sort()
+    return merge_index
+
+def find_overlapping_merge(merge_index, min_col, max_col, start_row, end_row):
     """
-    Apply cell merging based on the original sheet's merged cell ranges
+    Returns the (column, min_row, max_row) of an indexed merged range overlapping
+    rows start_row to end_row of columns min_col to max_col, or None if there is none.
+    """
+    for col_num in range(min_col, max_col + 1):
+        intervals = merge_index.get(col_num)
+        if not intervals:
+            continue
+        # The last interval starting at or before end_row is the only one that can reach start_row
+        position = bisect.bisect_right(intervals, (end_row, float('inf')))
+        if position and intervals[position - 1][1] >= start_row:
+            return (col_num, *intervals[position - 1])
+    return None
+
+def add_merge(pianist_ws, merge_index, start_row, start_column, end_row, end_column):
+    """
+    Merges a range of the worksheet and records it in the merge index.
+    """
+    pianist_ws.merge_cells(start_row=start_row, start_column=start_column, end_row=end_row, end_column=end_column)
+    for col_num in range(start_column, end_column + 1):
+        bisect.insort(merge_index.setdefault(col_num, []), (start_row, end_row))
+
+def apply_cell_merging(pianist_ws, merged_ranges, last_row, last_col):
+    """
+    Apply cell merging based on the original sheet's merged cell ranges,
+    given as (min_col, min_row, max_col, max_row) bounds,
     and also merge consecutive empty cells in each column.
     This preserves the exact merged cell structure from the input file
     plus handles empty cell merging.
     Note: All ranges are shifted down by 2 rows to accommodate pianist name and date headers.
+    last_row and last_col are the worksheet's max_row and max_column, which merging does not change.
     """
-    print("DEBUG - Starting cell merging process...")
+    logger.debug("Starting cell merging process...")
     
     # Row shift offset to account for pianist name (row 1) and date headers (row 2)
     ROW_SHIFT = 2
+
+    # Rows covered by merged ranges in each column, kept up to date as merges are
+    # added, so conflicts are found without scanning every existing merged range
+    merge_index = build_merge_index(pianist_ws)
     
     # First, copy original merged cell ranges (but skip row 1 to avoid conflicts with pianist name)
-    if not original_sheet.merged_cells:
-        print("DEBUG - No merged cells found in original sheet")
+    if not merged_ranges:
+        logger.debug("No merged cells found in original sheet")
     else:
-        print(f"DEBUG - Found {len(original_sheet.merged_cells.ranges)} merged cell ranges in original sheet")
+        logger.debug("Found %s merged cell ranges in original sheet", len(merged_ranges))
         
         # Copy each merged cell range from the original sheet, adjusting for row shift
-        for merged_range in original_sheet.merged_cells.ranges:
+        for merged_range in merged_ranges:
             try:
                 # Get the range coordinates and shift them down by ROW_SHIFT
-                min_col = merged_range.min_col
-                max_col = merged_range.max_col
-                min_row = merged_range.min_row + ROW_SHIFT
-                max_row = merged_range.max_row + ROW_SHIFT
+                min_col, min_row, max_col, max_row = merged_range
+                min_row += ROW_SHIFT
+                max_row += ROW_SHIFT
                 
                 # Skip merges that would conflict with pianist name (row 1) or date headers (row 2)
                 if min_row <= 2:
-                    print(f"DEBUG - Skipping merge {merged_range} because adjusted range {min_row}:{max_row} would conflict with headers")
+                    logger.debug("Skipping merge %s because adjusted range %s:%s would conflict with headers", merged_range, min_row, max_row)
                     continue
                 
                 # Only merge if it's actually a range (not a single cell)
                 if min_row != max_row or min_col != max_col:
                     # Check if this conflicts with existing merges
-                    conflict_found = False
-                    for existing_range in pianist_ws.merged_cells.ranges:
-                        if (not (max_row < existing_range.min_row or min_row > existing_range.max_row or
-                                max_col < existing_range.min_col or min_col > existing_range.max_col)):
-                            print(f"DEBUG - Merge conflict detected: adjusted {min_row}:{max_row},{min_col}:{max_col} conflicts with existing {existing_range}")
-                            conflict_found = True
-                            break
+                    existing_range = find_overlapping_merge(merge_index, min_col, max_col, min_row, max_row)
+                    conflict_found = existing_range is not None
+                    if conflict_found:
+                        logger.debug("Merge conflict detected: adjusted %s:%s,%s:%s conflicts with existing merge in column %s, rows %s-%s", min_row, max_row, min_col, max_col, *existing_range)
                     
                     if not conflict_found:
-                        pianist_ws.merge_cells(start_row=min_row, start_column=min_col, 
-                                             end_row=max_row, end_column=max_col)
-                        print(f"DEBUG - Merged cells from original: {merged_range} -> adjusted to {min_row}:{max_row},{min_col}:{max_col}")
+                        add_merge(pianist_ws, merge_index, min_row, min_col, max_row, max_col)
+                        logger.debug("Merged cells from original: %s -> adjusted to %s:%s,%s:%s", merged_range, min_row, max_row, min_col, max_col)
                     else:
-                        print(f"DEBUG - Skipped conflicting merge: {merged_range}")
+                        logger.debug("Skipped conflicting merge: %s", merged_range)
                 
             except Exception as e:
                 print(f"WARNING - Could not merge cells {merged_range}: {e}")
     
     # Apply evening time merging (19:00-22:00) for Monday to Friday (adjust for row shift)
-    apply_evening_time_merging(pianist_ws, ROW_SHIFT)
+    apply_evening_time_merging(pianist_ws, ROW_SHIFT, merge_index, last_row, last_col)
     
     # Additional merging for consecutive empty cells in each column (skip rows 1-2)
-    max_row = pianist_ws.max_row
-    max_col = pianist_ws.max_column
-    
-    print("DEBUG - Applying additional merging for consecutive empty cells...")
+    logger.debug("Applying additional merging for consecutive empty cells...")
     
-    # Process each column for merging consecutive empty cells (skip first column which is time, and skip rows 1-2)
-    for col_num in range(2, max_col + 1):
-        print(f"DEBUG - Processing column {col_num} for empty cell merging...")
+    # Process each column for merging consecutive empty cells (skip first column which is time, and skip rows 1-2).
+    # The values of each column are read in one pass rather than cell by cell.
+    column_values = pianist_ws.iter_cols(min_col=2, max_col=last_col, min_row=3, max_row=last_row, values_only=True)
+    for col_num, values in enumerate(column_values, start=2):
+        logger.debug("Processing column %s for empty cell merging...", col_num)
         
         # Create a list of (row_num, is_empty) pairs for this column (starting from row 3)
         column_data = []
-        for row_num in range(3, max_row + 1):
-            cell = pianist_ws.cell(row=row_num, column=col_num)
-            is_empty = not cell.value or str(cell.value).strip() == "" or str(cell.value).strip().lower() == "none"
+        for row_num, value in enumerate(values, start=3):
+            is_empty = not value or (isinstance(value, str) and value.strip().lower() in EMPTY_TEXTS)
             column_data.append((row_num, is_empty))
         
         # Group consecutive empty cells and merge them
@@ -238,86 +314,60 @@ def apply_cell_merging(pianist_ws, original_sheet):
                     
                     try:
                         # Check if this range overlaps with any existing merged ranges
-                        range_overlaps = False
-                        for existing_range in pianist_ws.merged_cells.ranges:
-                            if (existing_range.min_col <= col_num <= existing_range.max_col and
-                                not (end_row < existing_range.min_row or start_row > existing_range.max_row)):
-                                range_overlaps = True
-                                print(f"DEBUG - Empty cell merge in column {col_num}, rows {start_row}-{end_row} overlaps with existing merge {existing_range}")
-                                break
+                        existing_range = find_overlapping_merge(merge_index, col_num, col_num, start_row, end_row)
+                        range_overlaps = existing_range is not None
+                        if range_overlaps:
+                            logger.debug("Empty cell merge in column %s, rows %s-%s overlaps with existing merge in column %s, rows %s-%s", col_num, start_row, end_row, *existing_range)
                         
                         if not range_overlaps:
                             # Merge the empty cells
-                            pianist_ws.merge_cells(start_row=start_row, start_column=col_num, 
-                                                 end_row=end_row, end_column=col_num)
-                            print(f"DEBUG - Merged empty cells in column {col_num}, rows {start_row} to {end_row}")
+                            add_merge(pianist_ws, merge_index, start_row, col_num, end_row, col_num)
+                            logger.debug("Merged empty cells in column %s, rows %s to %s", col_num, start_row, end_row)
                         else:
-                            print(f"DEBUG - Skipped overlapping empty cell merge in column {col_num}, rows {start_row} to {end_row}")
+                            logger.debug("Skipped overlapping empty cell merge in column %s, rows %s to %s", col_num, start_row, end_row)
                     except Exception as e:
                         print(f"WARNING - Could not merge empty cells in column {col_num}, rows {start_row} to {end_row}: {e}")
 
-def apply_evening_time_merging(pianist_ws, row_shift=0):
+def apply_evening_time_merging(pianist_ws, row_shift=0, merge_index=None, last_row=None, last_col=None):
     """
     Merge cells from 19:00 to 22:00 in the same column for Monday to Friday.
     This merges evening time slots regardless of content.
+    merge_index is the worksheet's index from build_merge_index; it is built
+    here when not given, and new merges are added to it. last_row and last_col
+    are the worksheet's max_row and max_column, read from it when not given.
     """
-    print("DEBUG - Applying evening time merging (19:00-22:00)...")
+    if merge_index is None:
+        merge_index = build_merge_index(pianist_ws)
+    max_row = last_row if last_row is not None else pianist_ws.max_row
+    max_col = last_col if last_col is not None else pianist_ws.max_column
+    logger.debug("Applying evening time merging (19:00-22:00)...")
     
-    # Define evening time slots to merge
-    evening_times = ["19:00", "20:00", "21:00", "22:00"]
-    
-    # Find time column (column 1) to identify row numbers for evening times
+    # Find time column (column 1) to identify row numbers for evening times. process_sheet_data
+    # has already normalized the times to HH:MM, so they are looked up as they are.
     time_row_mapping = {}
-    max_row = pianist_ws.max_row
     
-    for row_num in range(1, max_row + 1):
-        cell = pianist_ws.cell(row=row_num, column=1)
-        if cell.value:
-            time_str = str(cell.value).strip()
-            # Handle various time formats
-            if isinstance(cell.value, datetime.time):
-                time_str = cell.value.strftime('%H:%M')
-            elif ':' in time_str:
-                # Already in HH:MM format
-                pass
-            elif '.' in time_str:
-                time_str = time_str.replace('.', ':')
-            elif len(time_str) == 4 and time_str.isdigit():
-                # HHMM format
-                time_str = f"{time_str[:2]}:{time_str[2:]}"
-            elif len(time_str) == 3 and time_str.isdigit():
-                # HMM format
-                time_str = f"0{time_str[0]}:{time_str[1:]}"
-            
-            # Normalize to HH:MM format
-            if ':' in time_str:
-                parts = time_str.split(':')
-                if len(parts) == 2:
-                    try:
-                        hour = int(parts[0])
-                        minute = int(parts[1])
-                        normalized_time = f"{hour:02d}:{minute:02d}"
-                        time_row_mapping[normalized_time] = row_num
-                    except ValueError:
-                        pass
+    time_column = pianist_ws.iter_rows(min_row=1, max_row=max_row, min_col=1, max_col=1, values_only=True)
+    for row_num, (value,) in enumerate(time_column, start=1):
+        if value in EVENING_TIMES:
+            time_row_mapping[value] = row_num
     
     # Find rows for evening times
     evening_rows = []
-    for time_slot in evening_times:
+    for time_slot in EVENING_TIMES:
         if time_slot in time_row_mapping:
             evening_rows.append(time_row_mapping[time_slot])
     
     if len(evening_rows) < 2:
-        print(f"DEBUG - Not enough evening time slots found. Found: {evening_rows}")
+        logger.debug("Not enough evening time slots found. Found: %s", evening_rows)
         return
     
     # Sort evening rows to ensure correct order
     evening_rows.sort()
     
-    print(f"DEBUG - Evening time rows to merge: {evening_rows} (times: {[time for time in evening_times if time in time_row_mapping]})")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Evening time rows to merge: %s (times: %s)", evening_rows, [time for time in EVENING_TIMES if time in time_row_mapping])
     
     # Process each column (Monday to Friday) - columns 2 to 6 typically
-    max_col = pianist_ws.max_column
     day_columns = range(2, min(max_col + 1, 7))  # Columns 2-6 for Mon-Fri
     
     for col_num in day_columns:
@@ -327,24 +377,171 @@ def apply_evening_time_merging(pianist_ws, row_shift=0):
         start_row = evening_rows[0]
         end_row = evening_rows[-1]
         
-        range_overlaps = False
-        for existing_range in pianist_ws.merged_cells.ranges:
-            if (existing_range.min_col <= col_num <= existing_range.max_col and
-                not (end_row < existing_range.min_row or start_row > existing_range.max_row)):
-                range_overlaps = True
-                print(f"DEBUG - Evening merge in column {col_num} ({column_letter}), rows {start_row}-{end_row} overlaps with existing merge {existing_range}")
-                break
+        existing_range = find_overlapping_merge(merge_index, col_num, col_num, start_row, end_row)
+        range_overlaps = existing_range is not None
+        if range_overlaps:
+            logger.debug("Evening merge in column %s (%s), rows %s-%s overlaps with existing merge in column %s, rows %s-%s", col_num, column_letter, start_row, end_row, *existing_range)
         
         if not range_overlaps:
             try:
                 # Merge evening time slots in this column
-                pianist_ws.merge_cells(start_row=start_row, start_column=col_num, 
-                                     end_row=end_row, end_column=col_num)
-                print(f"DEBUG - Merged evening times (19:00-22:00) in column {col_num} ({column_letter}), rows {start_row} to {end_row}")
+                add_merge(pianist_ws, merge_index, start_row, col_num, end_row, col_num)
+                logger.debug("Merged evening times (19:00-22:00) in column %s (%s), rows %s to %s", col_num, column_letter, start_row, end_row)
             except Exception as e:
                 print(f"WARNING - Could not merge evening times in column {col_num}: {e}")
         else:
-            print(f"DEBUG - Skipped overlapping evening merge in column {col_num} ({column_letter}), rows {start_row} to {end_row}")
+            logger.debug("Skipped overlapping evening merge in column %s (%s), rows %s to %s", col_num, column_letter, start_row, end_row)
+
+# Data shared by every pianist sheet, set in each worker process
+PIANIST_CONTEXT = {}
+
+def init_pianist_worker(context):
+    """
+    Stores the data shared by all pianist sheets in a worker process.
+    """
+    PIANIST_CONTEXT.update(context)
+
+def write_pianist_timetable(sheet_name, sheet_rows, merged_ranges, output_file_path):
+    """
+    Builds the timetable workbook of one pianist sheet, read by read_sheet_values,
+    with the camp mappings shared through PIANIST_CONTEXT, and saves it to
+    output_file_path. Runs in a worker process.
+    """
+    # Extract pianist name and camp from sheet name; the name pattern ensures there is a hyphen,
+    # and the pianist name is everything before the last one (e.g. 'Shelley_NG-campA')
+    pianist_name, camp_part = sheet_name.rsplit('-', 1)
+    camp_part = camp_part.lower()
+
+    # Replace hyphens and underscores with spaces for display purposes
+    pianist_display_name = pianist_name.replace('-', ' ').replace('_', ' ')
+    
+    logger.debug("Pianist: '%s', Display name: '%s', Camp: '%s'", pianist_name, pianist_display_name, camp_part)
+
+    # Determine which set of mappings to use and camp details
+    camp_name, start_date = CAMPS[camp_part]
+    student_map, room_no_map, room_no_pattern = PIANIST_CONTEXT['camp_mappings'][camp_part]
+
+    # Process the sheet's values for content
+    processed_data = process_sheet_data(sheet_rows, student_map, room_no_map, room_no_pattern)
+    
+    logger.debug("Processed %s rows of data", len(processed_data))
+
+    # Create a new workbook for this pianist
+    pianist_wb = Workbook()
+    pianist_ws = pianist_wb.active
+    pianist_ws.title = "Timetable"
+
+    # Copy processed data to new worksheet, starting from row 3 to accommodate pianist name and date headers.
+    # Appending an empty row only moves on to the next row, so rows 1 and 2 are left for the headers.
+    pianist_ws.append(())
+    pianist_ws.append(())
+    for row_data in processed_data:
+        pianist_ws.append(row_data)
+
+    logger.debug("Copied %s rows to new worksheet starting from row 3", len(processed_data))
+
+    # The worksheet's extent does not change after the data is copied. max_row and
+    # max_column scan every cell of the worksheet, so they are read only once.
+    max_row = pianist_ws.max_row
+    max_col = pianist_ws.max_column
+
+    # Clear row 1 completely and set up the pianist name
+    logger.debug("Clearing row 1 and setting up pianist name across %s columns", max_col)
+    
+    # Clear all cells in row 1 first
+    for col in range(1, max_col + 1):
+        pianist_ws.cell(row=1, column=col).value = None
+    
+    # Set pianist name only in the first cell
+    first_cell = pianist_ws.cell(row=1, column=1)
+    first_cell.value = pianist_display_name
+    first_cell.font = BOLD_FONT
+    
+    # Merge pianist name across all columns in row 1 (only if there are multiple columns)
+    if max_col > 1:
+        try:
+            pianist_ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=max_col)
+            logger.debug("Successfully merged pianist name '%s' across columns 1 to %s in row 1", pianist_display_name, max_col)
+        except Exception as e:
+            print(f"WARNING - Could not merge pianist name across row 1: {e}")
+
+    # Set up date headers in row 2 for columns 2-7 (Monday to Saturday)
+    logger.debug("Setting up date headers for %s starting %s", camp_name, start_date)
+    day_names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+    
+    for day_index in range(6):  # Monday to Saturday (6 days)
+        col_num = day_index + 2  # Columns 2-7
+        if col_num <= max_col:
+            current_date = start_date + datetime.timedelta(days=day_index)
+            header_text = current_date.strftime('%d %B (%A)')  # Format: "14 July (Monday)"
+            
+            header_cell = pianist_ws.cell(row=2, column=col_num)
+            header_cell.value = header_text
+            header_cell.font = BOLD_FONT
+            
+            logger.debug("Set date header for column %s: '%s'", col_num, header_text)
+
+    # Apply cell merging based on original sheet's merged cell structure and empty cells
+    # Note: Need to adjust merge ranges since we shifted data down by 2 rows
+    apply_cell_merging(pianist_ws, merged_ranges, max_row, max_col)
+
+    # Apply formatting: row heights and column widths
+    print(f"    Applying formatting for sheet '{sheet_name}'...")
+    
+    # Set all row heights to 35, adding the row dimensions in one update rather
+    # than having the dimension holder create each one on first access
+    pianist_ws.row_dimensions.update(
+        (row_num, RowDimension(pianist_ws, index=row_num, ht=35)) for row_num in range(1, max_row + 1)
+    )
+
+    # Set column widths: time column auto-fit, date columns set to 80
+    for col_num in range(1, max_col + 1):
+        column_letter = get_column_letter(col_num)
+        
+        if col_num == 1:  # Time column
+            # Auto-fit time column based on content. The column only holds the pianist
+            # name and the processed time column, so it is fitted from those values
+            # rather than by reading the worksheet's cells.
+            time_column = (pianist_display_name, *(row_data[0] for row_data in processed_data))
+            max_length = max((len(line) for value in time_column if value for line in str(value).split('\n')), default=0)
+            
+            # Set reasonable width for time column
+            font_size_factor = 1.3
+            padding = 2
+            if max_length > 0:
+                adjusted_width = max(max_length * font_size_factor + padding, 15)
+                adjusted_width = min(adjusted_width, 25)  # Reasonable max for time column
+            else:
+                adjusted_width = 15
+            pianist_ws.column_dimensions[column_letter].width = adjusted_width
+        else:  # Date columns
+            # Set date columns to width 80
+            pianist_ws.column_dimensions[column_letter].width = 80
+
+    # Apply borders, alignment, and font to all cells. Each combination is a named
+    # style, so a cell is styled with one assignment instead of three.
+    pianist_wb.add_named_style(NamedStyle(name=CELL_STYLE, font=REGULAR_FONT, alignment=CENTER_WRAP, border=THIN_BORDER))
+    pianist_wb.add_named_style(NamedStyle(name=BOLD_CELL_STYLE, font=BOLD_FONT, alignment=CENTER_WRAP, border=THIN_BORDER))
+    for row in pianist_ws.iter_rows(min_row=1, max_row=max_row, min_col=1, max_col=max_col):
+        for cell in row:
+            # Apply 20pt font to all cells, preserving existing bold formatting if any
+            if cell.font and cell.font.bold:
+                cell.style = BOLD_CELL_STYLE
+            else:
+                cell.style = CELL_STYLE
+
+    # Validate merged cells before saving
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Final merged cell count: %s", len(pianist_ws.merged_cells.ranges))
+        for i, merged_range in enumerate(pianist_ws.merged_cells.ranges):
+            logger.debug("Final merge %s: %s", i+1, merged_range)
+
+    # Save the individual pianist timetable
+    try:
+        pianist_wb.save(output_file_path)
+        print(f"    Successfully saved '{output_file_path}'")
+    except Exception as e:
+        print(f"    ERROR: Could not save '{output_file_path}'. {e}")
 
 def process_pianist_timetables():
     """
@@ -370,18 +567,30 @@ def process_pianist_timetables():
     student_map_b = load_student_name_mapping(os.path.join(input_dir, "student_mapping-campB.csv"))
     room_no_map_b = load_room_no_mapping(os.path.join(input_dir, "room_no_mapping-campB.csv"))
 
-    print(f"\nDEBUG - Camp A Student mappings loaded: {len(student_map_a)} entries")
-    print(f"DEBUG - Camp A Room mappings loaded: {len(room_no_map_a)} entries")
-    print(f"DEBUG - Camp B Student mappings loaded: {len(student_map_b)} entries")
-    print(f"DEBUG - Camp B Room mappings loaded: {len(room_no_map_b)} entries")
-    print()
+    # Each camp's room names are matched by one pattern, compiled once for all of its sheets
+    room_no_pattern_a = compile_replacement_pattern(room_no_map_a)
+    room_no_pattern_b = compile_replacement_pattern(room_no_map_b)
+
+    logger.debug("Camp A Student mappings loaded: %s entries", len(student_map_a))
+    logger.debug("Camp A Room mappings loaded: %s entries", len(room_no_map_a))
+    logger.debug("Camp B Student mappings loaded: %s entries", len(student_map_b))
+    logger.debug("Camp B Room mappings loaded: %s entries", len(room_no_map_b))
 
     # --- Load the master workbook ---
     try:
-        # Load without data_only to preserve merged cell information
-        master_workbook = load_workbook(master_file_path, data_only=False)
-        # Also load with data_only for actual cell values
-        master_workbook_data = load_workbook(master_file_path, data_only=True)
+        # Load once with data_only for the cells' values, streaming the sheets in read-only mode.
+        # Read-only workbooks keep the file open while rows are streamed, so the sheets
+        # are read up front and the file is always closed.
+        master_workbook = load_workbook(master_file_path, data_only=True, read_only=True)
+        try:
+            sheet_names = master_workbook.sheetnames
+            # Only pianist sheets are processed, so the other sheets are never read
+            master_sheets = {
+                sheet_name: read_sheet_values(master_workbook[sheet_name])
+                for sheet_name in sheet_names if PIANIST_SHEET_PATTERN.search(sheet_name)
+            }
+        finally:
+            master_workbook.close()
         print(f"Successfully loaded pianist timetable from '{master_file_path}'")
     except FileNotFoundError:
         print(f"ERROR: Pianist timetable file not found at '{master_file_path}'. Aborting.")
@@ -391,178 +600,46 @@ def process_pianist_timetables():
         return
 
     print("Processing sheets...")
-    print(f"DEBUG - Available sheets in workbook: {master_workbook.sheetnames}")
+    logger.debug("Available sheets in workbook: %s", sheet_names)
     
-    # Define border style
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-
-    for sheet_name in master_workbook.sheetnames:
+    # Output file of each pianist sheet. Sheets with the same sanitized name and camp
+    # would overwrite each other's file, so only the last of them is written; this
+    # also keeps the parallel workers writing to distinct files.
+    pianist_sheets = {}
+    for sheet_name in sheet_names:
         print(f"\n  - Processing sheet: '{sheet_name}'")
         
         # Check if sheet matches pianist name pattern (pianist name-campA/campB)
-        camp_match = re.search(r"-(camp[ab])$", sheet_name, re.IGNORECASE)
-        if not camp_match:
-            print(f"DEBUG - Skipping sheet '{sheet_name}' (doesn't match pianist name-camp pattern)")
+        if sheet_name not in master_sheets:
+            logger.debug("Skipping sheet '%s' (doesn't match pianist name-camp pattern)", sheet_name)
             continue
 
-        # Extract pianist name and camp from sheet name
-        parts = sheet_name.split('-')
-        if len(parts) >= 2:  # Changed from >= 3 to >= 2 to handle names like 'Shelley_NG-campA'
-            pianist_name = '-'.join(parts[:-1])  # All parts except the last (camp)
-            camp_part = parts[-1].lower()
-        else:
-            print(f"WARNING: Sheet '{sheet_name}' does not follow expected naming convention")
-            continue
-
-        # Replace hyphens and underscores with spaces for display purposes
-        pianist_display_name = pianist_name.replace('-', ' ').replace('_', ' ')
-        
-        print(f"DEBUG - Pianist: '{pianist_name}', Display name: '{pianist_display_name}', Camp: '{camp_part}'")
-
-        # Determine which set of mappings to use and camp details
-        if camp_part == "campa":
-            student_map = student_map_a
-            room_no_map = room_no_map_a
-            camp_name = "CampA"
-            start_date = datetime.date(2025, 7, 14)  # Camp A starts on 14 July 2025
-        elif camp_part == "campb":
-            student_map = student_map_b
-            room_no_map = room_no_map_b
-            camp_name = "CampB"
-            start_date = datetime.date(2025, 7, 21)  # Camp B starts on 21 July 2025
-        else:
-            continue
-
-        # Get both the original sheet (for structure) and data sheet (for values)
-        original_sheet = master_workbook[sheet_name]  # For merged cell info
-        data_sheet = master_workbook_data[sheet_name]  # For actual values
-        
-        # Process the data sheet for content
-        processed_data = process_sheet_data(data_sheet, student_map, room_no_map)
-        
-        print(f"DEBUG - Processed {len(processed_data)} rows of data")
-
-        # Create a new workbook for this pianist
-        pianist_wb = Workbook()
-        pianist_ws = pianist_wb.active
-        pianist_ws.title = "Timetable"
-
-        # Copy processed data to new worksheet, starting from row 3 to accommodate pianist name and date headers
-        for row_num, row_data in enumerate(processed_data, start=3):
-            for col_num, value in enumerate(row_data, start=1):
-                cell = pianist_ws.cell(row=row_num, column=col_num)
-                cell.value = value
-
-        print(f"DEBUG - Copied {len(processed_data)} rows to new worksheet starting from row 3")
-
-        # Clear row 1 completely and set up the pianist name
-        max_col = pianist_ws.max_column
-        print(f"DEBUG - Clearing row 1 and setting up pianist name across {max_col} columns")
-        
-        # Clear all cells in row 1 first
-        for col in range(1, max_col + 1):
-            pianist_ws.cell(row=1, column=col).value = None
-        
-        # Set pianist name only in the first cell
-        first_cell = pianist_ws.cell(row=1, column=1)
-        first_cell.value = pianist_display_name
-        first_cell.font = Font(bold=True, size=20)
-        
-        # Merge pianist name across all columns in row 1 (only if there are multiple columns)
-        if max_col > 1:
-            try:
-                pianist_ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=max_col)
-                print(f"DEBUG - Successfully merged pianist name '{pianist_display_name}' across columns 1 to {max_col} in row 1")
-            except Exception as e:
-                print(f"WARNING - Could not merge pianist name across row 1: {e}")
-
-        # Set up date headers in row 2 for columns 2-7 (Monday to Saturday)
-        print(f"DEBUG - Setting up date headers for {camp_name} starting {start_date}")
-        day_names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
-        
-        for day_index in range(6):  # Monday to Saturday (6 days)
-            col_num = day_index + 2  # Columns 2-7
-            if col_num <= max_col:
-                current_date = start_date + datetime.timedelta(days=day_index)
-                header_text = current_date.strftime('%d %B (%A)')  # Format: "14 July (Monday)"
-                
-                header_cell = pianist_ws.cell(row=2, column=col_num)
-                header_cell.value = header_text
-                header_cell.font = Font(bold=True, size=20)
-                
-                print(f"DEBUG - Set date header for column {col_num}: '{header_text}'")
-
-        # Apply cell merging based on original sheet's merged cell structure and empty cells
-        # Note: Need to adjust merge ranges since we shifted data down by 2 rows
-        apply_cell_merging(pianist_ws, original_sheet)
-
-        # Apply formatting: row heights and column widths
-        print(f"    Applying formatting for sheet '{sheet_name}'...")
-        
-        # Set all row heights to 35
-        for row_num in range(1, pianist_ws.max_row + 1):
-            pianist_ws.row_dimensions[row_num].height = 35
-
-        # Set column widths: time column auto-fit, date columns set to 80
-        for col_num in range(1, pianist_ws.max_column + 1):
-            column_letter = get_column_letter(col_num)
-            
-            if col_num == 1:  # Time column
-                # Auto-fit time column based on content
-                max_length = 0
-                for row_num in range(1, pianist_ws.max_row + 1):
-                    cell = pianist_ws.cell(row=row_num, column=col_num)
-                    if cell.value:
-                        lines = str(cell.value).split('\n')
-                        max_line_length = max(len(line) for line in lines) if lines else 0
-                        if max_line_length > max_length:
-                            max_length = max_line_length
-                
-                # Set reasonable width for time column
-                font_size_factor = 1.3
-                padding = 2
-                if max_length > 0:
-                    adjusted_width = max(max_length * font_size_factor + padding, 15)
-                    adjusted_width = min(adjusted_width, 25)  # Reasonable max for time column
-                else:
-                    adjusted_width = 15
-                pianist_ws.column_dimensions[column_letter].width = adjusted_width
-            else:  # Date columns
-                # Set date columns to width 80
-                pianist_ws.column_dimensions[column_letter].width = 80
-
-        # Apply borders, alignment, and font to all cells
-        for row in pianist_ws.iter_rows(min_row=1, max_row=pianist_ws.max_row, min_col=1, max_col=pianist_ws.max_column):
-            for cell in row:
-                cell.border = thin_border
-                cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-                # Apply 20pt font to all cells, preserving existing bold formatting if any
-                if cell.font and cell.font.bold:
-                    cell.font = Font(bold=True, size=20)
-                else:
-                    cell.font = Font(size=20)
-
-        # Validate merged cells before saving
-        print(f"DEBUG - Final merged cell count: {len(pianist_ws.merged_cells.ranges)}")
-        for i, merged_range in enumerate(pianist_ws.merged_cells.ranges):
-            print(f"DEBUG - Final merge {i+1}: {merged_range}")
-
-        # Save the individual pianist timetable
+        pianist_name, camp_part = sheet_name.rsplit('-', 1)
+        camp_name, _ = CAMPS[camp_part.lower()]
         sanitized_pianist_name = sanitize_filename(pianist_name)
-        output_file_path = os.path.join(output_dir, f"{sanitized_pianist_name}_{camp_name}_timetable.xlsx")
-        
-        try:
-            pianist_wb.save(output_file_path)
-            print(f"    Successfully saved '{output_file_path}'")
-        except Exception as e:
-            print(f"    ERROR: Could not save '{output_file_path}'. {e}")
+        pianist_sheets[os.path.join(output_dir, f"{sanitized_pianist_name}_{camp_name}_timetable.xlsx")] = sheet_name
+
+    # Each pianist's workbook is independent and building it is CPU-bound, so the
+    # sheets are written in parallel. The camp mappings are sent to each worker
+    # process once, through the initializer, rather than with every sheet.
+    pianist_context = {
+        'camp_mappings': {
+            'campa': (student_map_a, room_no_map_a, room_no_pattern_a),
+            'campb': (student_map_b, room_no_map_b, room_no_pattern_b),
+        },
+    }
+    with ProcessPoolExecutor(initializer=init_pianist_worker, initargs=(pianist_context,)) as executor:
+        list(executor.map(
+            write_pianist_timetable,
+            pianist_sheets.values(),
+            [master_sheets[sheet_name][0] for sheet_name in pianist_sheets.values()],
+            [master_sheets[sheet_name][1] for sheet_name in pianist_sheets.values()],
+            pianist_sheets,
+        ))
 
     print(f"\nProcessing complete. Individual pianist timetables saved to '{output_dir}' directory.")
 
 if __name__ == '__main__':
+    # Debug messages are hidden by default; set the level to logging.DEBUG to see them
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
     process_pianist_timetables() 
\ No newline at end of file
@@ -1,33 +1,144 @@
 import re
+import sys
 import csv
+from xml.etree import ElementTree
 from openpyxl import load_workbook
+from openpyxl.utils import range_boundaries
 import os
 
+# python-calamine (a Rust-based reader) is optional; openpyxl is used when it is not installed
+try:
+    from python_calamine import CalamineWorkbook
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
+# Tag of a merged range in a worksheet's XML
+MERGE_CELL_TAG = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}mergeCell'
+
+# Translation table that deletes characters not allowed in file names
+FILENAME_TRANSLATION = str.maketrans('', '', '\\/*?:"<>|\n')
+
 def sanitize_filename(filename):
     """
     Removes characters from a string that are not allowed in file names.
     """
-    return re.sub(r'[\\/*?:"<>|\n]', '', filename)
+    return filename.translate(FILENAME_TRANSLATION)
 
-def process_sheet(sheet):
+def get_merged_ranges(sheet):
+    """
+    Returns the (min_col, min_row, max_col, max_row) bounds of each merged range
+    in a sheet. Read-only worksheets do not expose merged cells, so for those
+    the ranges are streamed from the sheet's XML.
+    """
+    if hasattr(sheet, 'merged_cells'):
+        return [merged_cell_range.bounds for merged_cell_range in sheet.merged_cells.ranges]
+
+    merged_ranges = []
+    for _, element in ElementTree.iterparse(sheet._get_source()):
+        if element.tag == MERGE_CELL_TAG:
+            merged_ranges.append(range_boundaries(element.get('ref')))
+        element.clear()
+    return merged_ranges
+
+def compile_replacement_pattern(mapping):
+    """
+    Compiles a single regex matching any key of the mapping, so all keys can be
+    replaced in one pass with pattern.sub(lambda match: mapping[match.group(0)], text).
+    Longer keys are tried first so a key never matches inside a longer one.
+    Returns None for an empty mapping.
+    """
+    if not mapping:
+        return None
+    return re.compile('|'.join(re.escape(key) for key in sorted(mapping, key=len, reverse=True)))
+
+def normalize_cell_value(value):
+    """
+    Strips and interns string values and turns empty cells into empty strings.
+    """
+    if isinstance(value, str):
+        return sys.intern(value.strip())
+    return value if value is not None else ""
+
+def fill_merged_ranges(data, merged_ranges):
+    """
+    Fills every cell of each merged range in the extracted rows with the value
+    of the range's top-left cell. Bounds are 1-based, as (min_col, min_row, max_col, max_row).
+    Rows are padded with empty strings where a range extends past the read data.
     """
-    Processes a single sheet to extract its data, handling merged cells by
-    unmerging them and filling the values.
-    """
-    merged_ranges = list(sheet.merged_cells.ranges)
-    for merged_cell_range in merged_ranges:
-        min_col, min_row, max_col, max_row = merged_cell_range.bounds
-        top_left_cell_value = sheet.cell(row=min_row, column=min_col).value
-        sheet.unmerge_cells(str(merged_cell_range))
-        for row in sheet.iter_rows(min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col):
-            for cell in row:
-                cell.value = top_left_cell_value
+    for min_col, min_row, max_col, max_row in merged_ranges:
+        while len(data) < max_row:
+            data.append([""] * max_col)
+        top_left_row = data[min_row - 1]
+        top_left_value = top_left_row[min_col - 1] if len(top_left_row) >= min_col else ""
+        for row in data[min_row - 1:max_row]:
+            if len(row) < max_col:
+                row.extend([""] * (max_col - len(row)))
+            row[min_col - 1:max_col] = [top_left_value] * (max_col - min_col + 1)
 
-    data = []
-    for row in sheet.iter_rows():
-        data.append([cell.value if cell.value is not None else "" for cell in row])
+def process_sheet(sheet):
+    """
+    Processes a single sheet to extract its data, filling every cell of a
+    merged range with the value of its top-left cell. The sheet itself is not
+    modified, so read-only worksheets are supported. String values are stripped
+    and interned here once, so callers do not need to strip them again.
+    """
+    data = [[normalize_cell_value(value) for value in row] for row in sheet.iter_rows(values_only=True)]
+    fill_merged_ranges(data, get_merged_ranges(sheet))
     return data
 
+def load_processed_sheets(filename):
+    """
+    Loads every sheet of a workbook in order, processed as by process_sheet,
+    and returns them as a dict keyed by sheet name. Uses python-calamine when
+    it is installed and openpyxl in read-only mode otherwise.
+    """
+    processed_sheets = {}
+    if CALAMINE_AVAILABLE:
+        with open(filename, 'rb') as infile:
+            workbook = CalamineWorkbook.from_filelike(infile)
+        for sheet_name in workbook.sheet_names:
+            sheet = workbook.get_sheet_by_name(sheet_name)
+            data = [
+                # Calamine returns every number as a float; whole numbers are read as int like openpyxl does
+                [int(value) if isinstance(value, float) and value.is_integer() else normalize_cell_value(value) for value in row]
+                for row in sheet.to_python(skip_empty_area=False)
+            ]
+            # Calamine gives merged ranges as 0-based ((start_row, start_col), (end_row, end_col))
+            merged_ranges = [
+                (start_col + 1, start_row + 1, end_col + 1, end_row + 1)
+                for (start_row, start_col), (end_row, end_col) in sheet.merged_cell_ranges or []
+            ]
+            fill_merged_ranges(data, merged_ranges)
+            processed_sheets[sheet_name] = data
+        return processed_sheets
+
+    # Read-only workbooks keep the file open while rows are streamed, so always close it
+    workbook = load_workbook(filename, data_only=True, read_only=True)
+    try:
+        for sheet_name in workbook.sheetnames:
+            processed_sheets[sheet_name] = process_sheet(workbook[sheet_name])
+    finally:
+        workbook.close()
+    return processed_sheets
+
+def read_csv_columns(infile, *column_names):
+    """
+    Yields a tuple with the values of the named columns for each row of a CSV
+    file, read with a plain csv.reader rather than building a dict per row as
+    csv.DictReader does. As with DictReader, the first row is the header, blank
+    lines are skipped, and a column missing from the header or from a short
+    row gives None.
+    """
+    reader = csv.reader(infile)
+    # A repeated column name refers to its last occurrence, as with DictReader
+    header_indexes = {name: index for index, name in enumerate(next(reader, []))}
+    indexes = [header_indexes.get(name) for name in column_names]
+    for row in reader:
+        if not row:
+            continue
+        yield tuple(row[index] if index is not None and index < len(row) else None for index in indexes)
+
 def load_student_name_mapping(filename):
     """
     Loads student_no to student_name mappings from the specified CSV file.
@@ -35,10 +146,7 @@ def load_student_name_mapping(filename):
     name_map = {}
     try:
         with open(filename, mode='r', encoding='utf-8-sig') as infile:
-            reader = csv.DictReader(infile)
-            for row in reader:
-                student_no = row.get('student_no')
-                student_name = row.get('student_name')
+            for student_no, student_name in read_csv_columns(infile, 'student_no', 'student_name'):
                 if student_no and student_name:
                     name_map[student_no.strip()] = student_name.strip()
     except FileNotFoundError:
@@ -55,10 +163,7 @@ def load_room_no_mapping(filename):
     room_no_map = {}
     try:
         with open(filename, mode='r', encoding='utf-8-sig') as infile:
-            reader = csv.DictReader(infile)
-            for row in reader:
-                room_name = row.get('room_name')
-                room_number = row.get('room_number')
+            for room_name, room_number in read_csv_columns(infile, 'room_name', 'room_number'):
                 if room_name and room_number:
                     room_no_map[room_name.strip()] = room_number.strip()
     except FileNotFoundError:
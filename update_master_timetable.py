@@ -1,13 +1,27 @@
 import os
 import re
-import csv
-import shutil
+import logging
 from openpyxl import load_workbook
 from openpyxl.styles import Alignment
+from openpyxl.utils import get_column_letter
 from copy import copy
 
 # Assuming shared_utils.py is in the same directory or accessible in the python path
-from shared_utils import load_student_name_mapping
+from shared_utils import compile_replacement_pattern, load_student_name_mapping, read_csv_columns
+
+# Debug output goes through logging, so its messages are only formatted when DEBUG is enabled
+logger = logging.getLogger(__name__)
+
+# Patterns used on every cell of the master timetable, compiled once
+GROUP_PATTERN = re.compile(r'Group\s+(\d+)', re.IGNORECASE)
+COMPLEX_GROUP_PATTERN = re.compile(r'Group\s+(\d+(?:,\s*\d+)*)\s+(.+)', re.IGNORECASE)
+STUDENT_ID_PATTERN = re.compile(r'\b[FCH]\d+\b')
+# First letters of student IDs, to skip the ID pattern for text without any of them
+STUDENT_ID_PREFIXES = frozenset('FCH')
+ROOM_INFO_PATTERN = re.compile(r'\s*\(([^)]+)\)')
+
+# Instrument of a student, keyed by the prefix of the student ID
+INSTRUMENTS = {'F': 'Flute', 'C': 'Cello', 'H': 'Harp'}
 
 def load_room_no_mapping(filename):
     """
@@ -15,27 +29,19 @@ def load_room_no_mapping(filename):
     The CSV should have 'room_name' and 'room_number' columns.
     """
     room_mappings = {}
-    print(f"DEBUG - Loading room mapping from: {filename}")
+    logger.debug("Loading room mapping from: %s", filename)
     try:
         with open(filename, mode='r', encoding='utf-8-sig') as infile:
-            reader = csv.DictReader(infile)
-            print(f"DEBUG - CSV headers: {reader.fieldnames}")
-            
-            for row_num, row in enumerate(reader):
-                room_name = row.get('room_name')
-                room_number = row.get('room_number')
-                print(f"DEBUG - Row {row_num + 1}: room_name='{room_name}', room_number='{room_number}'")
-                
+            for room_name, room_number in read_csv_columns(infile, 'room_name', 'room_number'):
                 if room_name and room_number:
                     room_mappings[room_name.strip()] = room_number.strip()
-                    print(f"DEBUG - Added room mapping: '{room_name.strip()}' -> '{room_number.strip()}'")
                         
     except FileNotFoundError:
         print(f"Warning: Room mapping file '{filename}' not found.")
     except Exception as e:
         print(f"An error occurred while reading {filename}: {e}")
     
-    print(f"DEBUG - Final room mappings loaded: {room_mappings}")
+    logger.debug("Final room mappings loaded: %s", room_mappings)
     return room_mappings
 
 def load_group_mapping(filename):
@@ -46,45 +52,124 @@ def load_group_mapping(filename):
     values are lists of student IDs (e.g., ["F1", "C3", "H5"]).
     """
     group_mappings = {}
-    print(f"DEBUG - Loading group mapping from: {filename}")
+    logger.debug("Loading group mapping from: %s", filename)
     try:
         with open(filename, mode='r', encoding='utf-8-sig') as infile:
-            reader = csv.DictReader(infile)
-            print(f"DEBUG - CSV headers: {reader.fieldnames}")
-            
-            for row_num, row in enumerate(reader):
-                group_number = row.get('group_number')
-                student_nos_str = row.get('student_no')
-                print(f"DEBUG - Row {row_num + 1}: group_number='{group_number}', student_no='{student_nos_str}'")
-                
+            for group_number, student_nos_str in read_csv_columns(infile, 'group_number', 'student_no'):
                 if group_number and student_nos_str:
                     group_name = f"Group {group_number.strip()}"
                     # Find all student IDs like F1, C12, H5
-                    student_ids = re.findall(r'\b[FCH]\d+\b', student_nos_str)
-                    print(f"DEBUG - Extracted student IDs: {student_ids}")
+                    student_ids = STUDENT_ID_PATTERN.findall(student_nos_str)
                     
                     if student_ids:
                         group_mappings[group_name] = student_ids
-                        print(f"DEBUG - Added mapping: {group_name} -> {student_ids}")
                         
     except FileNotFoundError:
         print(f"Warning: Group mapping file '{filename}' not found.")
     except Exception as e:
         print(f"An error occurred while reading {filename}: {e}")
     
-    print(f"DEBUG - Final group mappings loaded: {group_mappings}")
+    logger.debug("Final group mappings loaded: %s", group_mappings)
     return group_mappings
 
 def get_instrument_from_student_id(student_id):
     """Deduces the instrument name from the student ID prefix."""
-    prefix = student_id[0].upper()
-    if prefix == 'F':
-        return 'Flute'
-    elif prefix == 'C':
-        return 'Cello'
-    elif prefix == 'H':
-        return 'Harp'
-    return 'Unknown'
+    return INSTRUMENTS.get(student_id[:1].upper(), 'Unknown')
+
+def replace_cell_text(text, student_map, group_map, room_no_map, room_no_pattern):
+    """
+    Replaces the group and student numbers in the text of a master timetable
+    cell with names, then room names with room numbers. Works on the plain
+    string only, so no openpyxl cell attributes are touched here.
+    room_no_pattern is room_no_map compiled with compile_replacement_pattern.
+    Returns the new text and whether the cell holds a group activity, which
+    is centred and wrapped.
+    """
+    cell_value = text.strip()
+    is_group_cell = False
+
+    # Priority 1: Check for an exact group match (e.g., "Group 1")
+    group_match = GROUP_PATTERN.fullmatch(cell_value)
+    if group_match:
+        logger.debug("Found exact group match: '%s'", cell_value)
+        group_name = f"Group {group_match.group(1)}"
+        student_ids_in_group = group_map.get(group_name, [])
+        
+        logger.debug("Looking for group '%s', found students: %s", group_name, student_ids_in_group)
+        
+        if student_ids_in_group:
+            replacement_lines = [group_name]
+            for sid in student_ids_in_group:
+                student_name = student_map.get(sid, sid)
+                instrument = get_instrument_from_student_id(sid)
+                replacement_lines.append(f"{student_name}, {instrument}")
+                logger.debug("Replacing %s with %s, %s", sid, student_name, instrument)
+            
+            text = "\n".join(replacement_lines)
+            is_group_cell = True
+    else:
+        # Priority 1.5: Check for complex group pattern (e.g., "Group 2, 5, 7, 9 Acting Class (Room Acting Class)")
+        complex_group_match = COMPLEX_GROUP_PATTERN.match(cell_value)
+        if complex_group_match:
+            logger.debug("Found complex group match: '%s'", cell_value)
+            group_numbers_str = complex_group_match.group(1)
+            activity_with_room = complex_group_match.group(2).strip()
+            
+            logger.debug("Group numbers: '%s', Activity: '%s'", group_numbers_str, activity_with_room)
+            
+            # Extract individual group numbers
+            group_numbers = [num.strip() for num in group_numbers_str.split(',')]
+            
+            # Build the replacement
+            replacement_lines = []
+            
+            # Add activity and room info first
+            # Check if there's room info in parentheses
+            room_match = ROOM_INFO_PATTERN.search(activity_with_room)
+            if room_match:
+                activity_name = ROOM_INFO_PATTERN.sub('', activity_with_room).strip()
+                room_info = room_match.group(1)
+                replacement_lines.append(activity_name)
+                replacement_lines.append(f"({room_info})")
+            else:
+                replacement_lines.append(activity_with_room)
+            
+            # Add each group with its students
+            for group_num in group_numbers:
+                group_name = f"Group {group_num}"
+                student_ids_in_group = group_map.get(group_name, [])
+                
+                logger.debug("Looking for group '%s', found students: %s", group_name, student_ids_in_group)
+                
+                # Add group name on its own line
+                replacement_lines.append(group_name)
+                
+                if student_ids_in_group:
+                    # Add student names on the next line
+                    student_names = []
+                    for sid in student_ids_in_group:
+                        student_name = student_map.get(sid, sid)
+                        student_names.append(student_name)
+                        logger.debug("Replacing %s with %s", sid, student_name)
+                    replacement_lines.append(', '.join(student_names))
+            
+            text = "\n".join(replacement_lines)
+            is_group_cell = True
+        else:
+            # Priority 2: Replace student numbers within any other text.
+            # Most of these cells contain no F, C or H at all, so cannot hold a student ID
+            if not STUDENT_ID_PREFIXES.isdisjoint(text):
+                # Replace every ID in one pass; IDs without a mapping are kept
+                text, ids_replaced = STUDENT_ID_PATTERN.subn(lambda match: student_map.get(match.group(0), match.group(0)), text)
+                if ids_replaced:
+                    logger.debug("Replaced %s student IDs", ids_replaced)
+
+    # Apply room mappings to all cells (final step after all other replacements)
+    if text and room_no_pattern:
+        # Replace all room names with room numbers in a single scan
+        text = room_no_pattern.sub(lambda match: room_no_map[match.group(0)], text)
+
+    return text, is_group_cell
 
 def update_master_timetable():
     """
@@ -102,279 +187,131 @@ def update_master_timetable():
     ]
 
     # --- Load all mapping files ---
+    # Each camp's mappings are kept together, keyed by the camp letter its sheet names end with
     print("Loading mapping files...")
-    student_map_a = load_student_name_mapping(os.path.join(input_dir, "student_mapping-campA.csv"))
-    group_map_a = load_group_mapping(os.path.join(input_dir, "group_mapping-campA.csv"))
-    room_no_map_a = load_room_no_mapping(os.path.join(input_dir, "room_no_mapping-campA.csv"))
-    
-    student_map_b = load_student_name_mapping(os.path.join(input_dir, "student_mapping-campB.csv"))
-    group_map_b = load_group_mapping(os.path.join(input_dir, "group_mapping-campB.csv"))
-    room_no_map_b = load_room_no_mapping(os.path.join(input_dir, "room_no_mapping-campB.csv"))
-
-    # Debug: Print loaded mappings
-    print(f"\nDEBUG - Camp A Student mappings loaded: {len(student_map_a)} entries")
-    print(f"Sample student mappings: {dict(list(student_map_a.items())[:3])}")
-    print(f"DEBUG - Camp A Group mappings loaded: {len(group_map_a)} entries")
-    print(f"Sample group mappings: {dict(list(group_map_a.items())[:3])}")
-    print(f"DEBUG - Camp A Room mappings loaded: {len(room_no_map_a)} entries")
-    print(f"Sample room mappings: {dict(list(room_no_map_a.items())[:3])}")
-    
-    print(f"DEBUG - Camp B Student mappings loaded: {len(student_map_b)} entries")
-    print(f"Sample student mappings: {dict(list(student_map_b.items())[:3])}")
-    print(f"DEBUG - Camp B Group mappings loaded: {len(group_map_b)} entries")
-    print(f"Sample group mappings: {dict(list(group_map_b.items())[:3])}")
-    print(f"DEBUG - Camp B Room mappings loaded: {len(room_no_map_b)} entries")
-    print(f"Sample room mappings: {dict(list(room_no_map_b.items())[:3])}")
-    print()
-
-    # --- Create a copy of the master file to preserve the original ---
+    camp_mappings = {}
+    for camp in ("A", "B"):
+        student_map = load_student_name_mapping(os.path.join(input_dir, f"student_mapping-camp{camp}.csv"))
+        group_map = load_group_mapping(os.path.join(input_dir, f"group_mapping-camp{camp}.csv"))
+        room_no_map = load_room_no_mapping(os.path.join(input_dir, f"room_no_mapping-camp{camp}.csv"))
+        # One pattern per camp matching any of its room names
+        room_no_pattern = compile_replacement_pattern(room_no_map)
+        camp_mappings[camp] = (student_map, group_map, room_no_map, room_no_pattern)
+
+        # Debug: Print loaded mappings
+        if logger.isEnabledFor(logging.DEBUG):
+            for kind, mapping in (("Student", student_map), ("Group", group_map), ("Room", room_no_map)):
+                logger.debug("Camp %s %s mappings loaded: %s entries", camp, kind, len(mapping))
+                logger.debug("Sample mappings: %s", dict(list(mapping.items())[:3]))
+
+    # --- Load the master workbook for processing ---
+    # The original is preserved because the result is saved under a new name,
+    # so there is no need to copy the file first and load the copy
     try:
-        shutil.copy(master_file_path, output_file_path)
-        print(f"Successfully copied '{master_file_path}' to '{output_file_path}'.")
+        workbook = load_workbook(master_file_path)
     except FileNotFoundError:
         print(f"ERROR: Master file not found at '{master_file_path}'. Aborting.")
         return
     except Exception as e:
-        print(f"ERROR: Could not copy file. {e}")
-        return
-
-    # --- Load the copied workbook for processing ---
-    try:
-        workbook = load_workbook(output_file_path)
-    except Exception as e:
-        print(f"ERROR: Could not load the workbook '{output_file_path}'. {e}")
+        print(f"ERROR: Could not load the workbook '{master_file_path}'. {e}")
         return
 
     print("Processing sheets...")
-    print(f"DEBUG - Available sheets in workbook: {workbook.sheetnames}")
-    print(f"DEBUG - Target sheets to process: {target_sheets}")
+    # Centred and wrapped version of each alignment in the workbook, keyed by the
+    # original alignment's id, so group cells sharing an alignment reuse one object
+    centered_alignments = {}
+    logger.debug("Available sheets in workbook: %s", workbook.sheetnames)
+    logger.debug("Target sheets to process: %s", target_sheets)
     
     for sheet_name in workbook.sheetnames:
         if sheet_name not in target_sheets:
-            print(f"DEBUG - Skipping sheet '{sheet_name}' (not in target list)")
+            logger.debug("Skipping sheet '%s' (not in target list)", sheet_name)
             continue
 
         print(f"\n  - Processing sheet: '{sheet_name}'")
         sheet = workbook[sheet_name]
 
-        # Determine which set of mappings to use
-        if "Camp-A" in sheet_name:
-            student_map = student_map_a
-            group_map = group_map_a
-            room_no_map = room_no_map_a
-        elif "Camp-B" in sheet_name:
-            student_map = student_map_b
-            group_map = group_map_b
-            room_no_map = room_no_map_b
-        else:
+        # Determine which set of mappings to use from the camp letter the sheet name ends with
+        camp = sheet_name.rsplit('-', 1)[-1]
+        if camp not in camp_mappings:
             continue # Should not happen with the current target_sheets list
+        student_map, group_map, room_no_map, room_no_pattern = camp_mappings[camp]
 
-        # Track cells that have been modified for resizing
-        modified_cells = []
         cells_processed = 0
         cells_modified = 0
 
-        # Iterate over every cell in the sheet
-        for row in sheet.iter_rows():
-            for cell in row:
-                if not cell.value or not isinstance(cell.value, str):
-                    continue
-                
+        # Longest line of each column and most lines of each row, measured in the
+        # same pass as the replacements so the cells are only walked once
+        column_max_lengths = {}
+        row_max_lines = {}
+
+        # Only the cells stored in the sheet are visited. iter_rows would walk the
+        # whole max_row x max_column grid and create an empty cell for every gap,
+        # each of which openpyxl then also walks when saving.
+        for cell in sheet._cells.values():
+            value = cell.value
+            # Skip empty cells, including merged cells that don't have values
+            if not value:
+                continue
+
+            if isinstance(value, str):
                 cells_processed += 1
-                cell_value = cell.value.strip()
-                original_value = cell.value
 
                 # Debug: Print every cell being processed (limit to first 10 for readability)
                 if cells_processed <= 10:
-                    print(f"DEBUG - Processing cell {cell.coordinate}: '{cell_value}'")
-
-                # Priority 1: Check for an exact group match (e.g., "Group 1")
-                group_match = re.fullmatch(r'Group\s+(\d+)', cell_value, re.IGNORECASE)
-                if group_match:
-                    print(f"DEBUG - Found exact group match in {cell.coordinate}: '{cell_value}'")
-                    group_name = f"Group {group_match.group(1)}"
-                    student_ids_in_group = group_map.get(group_name, [])
-                    
-                    print(f"DEBUG - Looking for group '{group_name}', found students: {student_ids_in_group}")
-                    
-                    if student_ids_in_group:
-                        replacement_lines = [group_name]
-                        for sid in student_ids_in_group:
-                            student_name = student_map.get(sid, sid)
-                            instrument = get_instrument_from_student_id(sid)
-                            replacement_lines.append(f"{student_name}, {instrument}")
-                            print(f"DEBUG - Replacing {sid} with {student_name}, {instrument}")
-                        
-                        cell.value = "\n".join(replacement_lines)
-                        print(f"DEBUG - Cell {cell.coordinate} updated to: '{cell.value}'")
+                    logger.debug("Processing cell %s: '%s'", cell.coordinate, value.strip())
+
+                new_value, is_group_cell = replace_cell_text(value, student_map, group_map, room_no_map, room_no_pattern)
 
+                # Only cells whose text changed, or group cells, are written back
+                if new_value != value or is_group_cell:
+                    cell.value = new_value
+                    logger.debug("Cell %s updated from '%s' to '%s'", cell.coordinate, value, new_value)
+                    cells_modified += 1
+
+                    if is_group_cell:
                         # Update alignment for readability, preserving as much as possible
-                        new_alignment = copy(cell.alignment)
-                        new_alignment.wrap_text = True
-                        new_alignment.vertical = 'center'
-                        new_alignment.horizontal = 'center'
+                        alignment_id = cell._style.alignmentId
+                        new_alignment = centered_alignments.get(alignment_id)
+                        if new_alignment is None:
+                            new_alignment = copy(cell.alignment)
+                            new_alignment.wrap_text = True
+                            new_alignment.vertical = 'center'
+                            new_alignment.horizontal = 'center'
+                            centered_alignments[alignment_id] = new_alignment
                         cell.alignment = new_alignment
-                        modified_cells.append(cell)
-                        cells_modified += 1
-                else:
-                    # Priority 1.5: Check for complex group pattern (e.g., "Group 2, 5, 7, 9 Acting Class (Room Acting Class)")
-                    complex_group_match = re.match(r'Group\s+(\d+(?:,\s*\d+)*)\s+(.+)', cell_value, re.IGNORECASE)
-                    if complex_group_match:
-                        print(f"DEBUG - Found complex group match in {cell.coordinate}: '{cell_value}'")
-                        group_numbers_str = complex_group_match.group(1)
-                        activity_with_room = complex_group_match.group(2).strip()
-                        
-                        print(f"DEBUG - Group numbers: '{group_numbers_str}', Activity: '{activity_with_room}'")
-                        
-                        # Extract individual group numbers
-                        group_numbers = [num.strip() for num in group_numbers_str.split(',')]
-                        
-                        # Build the replacement
-                        replacement_lines = []
-                        
-                        # Add activity and room info first
-                        # Check if there's room info in parentheses
-                        room_match = re.search(r'\(([^)]+)\)', activity_with_room)
-                        if room_match:
-                            activity_name = re.sub(r'\s*\([^)]+\)', '', activity_with_room).strip()
-                            room_info = room_match.group(1)
-                            replacement_lines.append(activity_name)
-                            replacement_lines.append(f"({room_info})")
-                        else:
-                            replacement_lines.append(activity_with_room)
-                        
-                        # Add each group with its students
-                        for group_num in group_numbers:
-                            group_name = f"Group {group_num}"
-                            student_ids_in_group = group_map.get(group_name, [])
-                            
-                            print(f"DEBUG - Looking for group '{group_name}', found students: {student_ids_in_group}")
-                            
-                            # Add group name on its own line
-                            replacement_lines.append(group_name)
-                            
-                            if student_ids_in_group:
-                                # Add student names on the next line
-                                student_names = []
-                                for sid in student_ids_in_group:
-                                    student_name = student_map.get(sid, sid)
-                                    student_names.append(student_name)
-                                    print(f"DEBUG - Replacing {sid} with {student_name}")
-                                replacement_lines.append(', '.join(student_names))
-                        
-                        cell.value = "\n".join(replacement_lines)
-                        print(f"DEBUG - Cell {cell.coordinate} updated to: '{cell.value}'")
-
-                        # Update alignment for readability
-                        new_alignment = copy(cell.alignment)
-                        new_alignment.wrap_text = True
-                        new_alignment.vertical = 'center'
-                        new_alignment.horizontal = 'center'
-                        cell.alignment = new_alignment
-                        modified_cells.append(cell)
-                        cells_modified += 1
-                    else:
-                        # Priority 2: Replace student numbers within any other text
-                        new_cell_value = cell.value
-                        student_ids_found = re.findall(r'\b[FCH]\d+\b', new_cell_value)
-                        
-                        if student_ids_found:
-                            print(f"DEBUG - Found student IDs in {cell.coordinate}: {student_ids_found}")
-                        
-                        # Use a set to avoid replacing the same ID multiple times if it appears more than once
-                        for student_id in set(student_ids_found):
-                            student_name = student_map.get(student_id, student_id)
-                            print(f"DEBUG - Replacing student ID {student_id} with {student_name}")
-                            # Use word boundary regex for safer replacement
-                            new_cell_value = re.sub(r'\b' + re.escape(student_id) + r'\b', student_name, new_cell_value)
-                        
-                        if new_cell_value != cell.value:
-                            cell.value = new_cell_value
-                            print(f"DEBUG - Cell {cell.coordinate} updated from '{original_value}' to '{cell.value}'")
-                            modified_cells.append(cell)
-                            cells_modified += 1
-
-                # Apply room mappings to all cells (final step after all other replacements)
-                if cell.value and isinstance(cell.value, str):
-                    original_cell_value = cell.value
-                    updated_cell_value = cell.value
-                    
-                    # Replace room names with room numbers
-                    for room_name, room_number in room_no_map.items():
-                        if room_name in updated_cell_value:
-                            updated_cell_value = updated_cell_value.replace(room_name, room_number)
-                            print(f"DEBUG - Replacing room '{room_name}' with '{room_number}' in {cell.coordinate}")
-                    
-                    # Update cell if room mappings were applied
-                    if updated_cell_value != original_cell_value:
-                        cell.value = updated_cell_value
-                        print(f"DEBUG - Cell {cell.coordinate} room mapping updated to: '{cell.value}'")
-                        if cell not in modified_cells:
-                            modified_cells.append(cell)
-                            cells_modified += 1
 
-        print(f"DEBUG - Sheet '{sheet_name}' summary: {cells_processed} cells processed, {cells_modified} cells modified")
+                    value = new_value
+                    if not value:
+                        continue
+
+            # Count lines and find the longest line; single-line values,
+            # the most common, are measured without splitting them
+            text = value if isinstance(value, str) else str(value)
+            line_count = text.count('\n') + 1
+            if line_count == 1:
+                max_line_length = len(text)
+            else:
+                max_line_length = max(map(len, text.split('\n')))
+                if line_count > row_max_lines.get(cell.row, 1):
+                    row_max_lines[cell.row] = line_count
+            if max_line_length > column_max_lengths.get(cell.column, 0):
+                column_max_lengths[cell.column] = max_line_length
+
+        logger.debug("Sheet '%s' summary: %s cells processed, %s cells modified", sheet_name, cells_processed, cells_modified)
 
         # Auto-resize columns to fit content
         print(f"    Auto-resizing columns for sheet '{sheet_name}'...")
-        for column_cells in sheet.columns:
-            max_length = 0
-            # Handle merged cells - use the first non-merged cell to get column letter
-            column_letter = None
-            for cell in column_cells:
-                if hasattr(cell, 'column_letter'):
-                    column_letter = cell.column_letter
-                    break
-            
-            # If we couldn't find a column letter, skip this column
-            if not column_letter:
-                continue
-            
-            for cell in column_cells:
-                # Skip merged cells that don't have values
-                if not hasattr(cell, 'value') or not cell.value:
-                    continue
-                    
-                # Count lines and find the longest line
-                lines = str(cell.value).split('\n')
-                max_line_length = max(len(line) for line in lines) if lines else 0
-                if max_line_length > max_length:
-                    max_length = max_line_length
-            
+        for column, max_length in column_max_lengths.items():
             # Set column width with padding (add 2 for padding)
-            if max_length > 0:
-                adjusted_width = min(max_length + 2, 100)  # Cap at 100 to prevent extremely wide columns
-                sheet.column_dimensions[column_letter].width = adjusted_width
+            adjusted_width = min(max_length + 2, 100)  # Cap at 100 to prevent extremely wide columns
+            sheet.column_dimensions[get_column_letter(column)].width = adjusted_width
 
         # Auto-resize rows to fit content
         print(f"    Auto-resizing rows for sheet '{sheet_name}'...")
-        for row in sheet.iter_rows():
-            max_lines = 1
-            row_number = None
-            
-            # Get row number from the first non-merged cell
-            for cell in row:
-                if hasattr(cell, 'row'):
-                    row_number = cell.row
-                    break
-            
-            # If we couldn't find a row number, skip this row
-            if not row_number:
-                continue
-            
-            for cell in row:
-                # Skip merged cells that don't have values
-                if not hasattr(cell, 'value') or not cell.value:
-                    continue
-                    
-                # Count the number of lines in the cell
-                lines = str(cell.value).count('\n') + 1
-                if lines > max_lines:
-                    max_lines = lines
-            
-            # Set row height based on number of lines (15 points per line + padding)
-            if max_lines > 1:
-                sheet.row_dimensions[row_number].height = max_lines * 18 + 5  # 18 points per line + 5 for padding
+        for row_number, max_lines in row_max_lines.items():
+            # Set row height based on number of lines
+            sheet.row_dimensions[row_number].height = max_lines * 18 + 5  # 18 points per line + 5 for padding
     
     # --- Save the updated workbook ---
     try:
@@ -384,4 +321,6 @@ def update_master_timetable():
         print(f"ERROR: Could not save the updated workbook. {e}")
 
 if __name__ == '__main__':
-    update_master_timetable() 
\ No newline at end of file
+    # Debug messages are hidden by default; set the level to logging.DEBUG to see them
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    update_master_timetable()